@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+
+from ...models.schemas import CacheStats
+from ...core.auth import get_admin_user_id
+from ...core.container import get_cache_budget
+from ...services.cache_budget import CacheBudget
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/cache", response_model=CacheStats)
+async def get_cache_stats(
+    admin_id: str = Depends(get_admin_user_id),
+    cache_budget: CacheBudget = Depends(get_cache_budget)
+):
+    """Get estimated key counts and memory per cache namespace"""
+    return {"namespaces": await cache_budget.usage()}
@@ -1,20 +1,20 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from ...core.container import get_auth_service
 from ...services.auth_service import AuthService
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
-auth_service = AuthService()
 
 @router.get("/hh")
-async def hh_auth():
+async def hh_auth(auth_service: AuthService = Depends(get_auth_service)):
     return {
         "url": f"https://hh.ru/oauth/authorize?response_type=code&client_id={auth_service.hh_client.client_id}&redirect_uri=http://localhost:3000"
     }
 
 @router.post("/callback")
-async def auth_callback(code: str):
+async def auth_callback(code: str, auth_service: AuthService = Depends(get_auth_service)):
     return await auth_service.handle_oauth_callback(code)
 
 @router.post("/refresh")
-async def refresh_token(refresh_token: str):
+async def refresh_token(refresh_token: str, auth_service: AuthService = Depends(get_auth_service)):
     """Refresh access token using HH refresh token"""
     return await auth_service.refresh_token(refresh_token)
\ No newline at end of file
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict, List
+
+from ...core.auth import get_admin_user_id
+from ...core.container import Container, get_container
+
+router = APIRouter(prefix="/debug", tags=["admin"])
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10, gt=0, le=60),
+    admin_id: str = Depends(get_admin_user_id),
+    container: Container = Depends(get_container)
+):
+    """Sample all threads for a while, return collapsed stacks for a flamegraph"""
+    if container.profiler.busy:
+        raise HTTPException(409, "A profile is already running")
+    return await container.profiler.profile(seconds)
+
+@router.get("/loop-lag")
+async def loop_lag(
+    admin_id: str = Depends(get_admin_user_id),
+    container: Container = Depends(get_container)
+) -> List[Dict[str, Any]]:
+    """Get recent event loop blocking intervals with the stack that caused them"""
+    return container.loop_monitor.recent()
@@ -1,30 +1,46 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from ...models.schemas import ResumeResponse, Dictionaries, ResponseHistoryItem
+from ...models.schemas import ResumeResponse, Dictionaries, ResponseHistoryItem, HistoryStats
 from ...models.db_models import ResponseHistory
 from ...core.auth import get_current_user_id
+from ...core.container import get_hh_service
 from ...core.database import get_db
+from ...core.http_cache import cached_json_response
 from ...services.hh_service import HHService
+from ...services.history_stats import get_stats
 
 router = APIRouter(prefix="/api", tags=["user"])
-hh_service = HHService()
+
+# Reference data only changes with a new snapshot version, which changes the ETag
+REFERENCE_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
 
 @router.get("/resume", response_model=ResumeResponse)
-async def get_resume(user_id: str = Depends(get_current_user_id)):
+async def get_resume(
+    user_id: str = Depends(get_current_user_id),
+    hh_service: HHService = Depends(get_hh_service)
+):
     """Get user's resume"""
     return await hh_service.get_user_resume(user_id)
 
 @router.get("/dictionaries", response_model=Dictionaries)
-async def get_dictionaries():
+async def get_dictionaries(
+    if_none_match: Optional[str] = Header(None),
+    hh_service: HHService = Depends(get_hh_service)
+):
     """Get HH dictionaries for filters"""
-    return await hh_service.get_dictionaries()
+    body, etag = await hh_service.get_dictionaries_json()
+    return cached_json_response(body, etag, if_none_match, REFERENCE_CACHE_CONTROL)
 
 @router.get("/areas")
-async def get_areas():
+async def get_areas(
+    if_none_match: Optional[str] = Header(None),
+    hh_service: HHService = Depends(get_hh_service)
+):
     """Get areas (cities) for filters"""
-    return await hh_service.get_areas()
+    body, etag = await hh_service.get_areas_json()
+    return cached_json_response(body, etag, if_none_match, REFERENCE_CACHE_CONTROL)
 
 @router.get("/history", response_model=List[ResponseHistoryItem])
 async def get_history(
@@ -36,4 +52,12 @@ async def get_history(
         ResponseHistory.user_id == user_id
     ).order_by(ResponseHistory.created_at.desc()).all()
     
-    return history
\ No newline at end of file
+    return history
+
+@router.get("/history/stats", response_model=HistoryStats)
+def get_history_stats(
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """Get user's application statistics from precomputed rollups"""
+    return get_stats(db, user_id)
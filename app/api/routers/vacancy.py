@@ -1,33 +1,38 @@
-from fastapi import APIRouter, Depends, Query
-from typing import Optional
-from sqlalchemy.orm import Session
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, Optional
 
 from ...core.auth import get_current_user_id
-from ...core.database import get_db
-from ...services.hh_service import HHService
-from ...models.db_models import ResponseHistory
+from ...core.container import get_hh_service, get_history_recorder
+from ...core.http_cache import cached_json_response
+from ...services.hh_service import ExportIncomplete, HHService
+from ...services.history_recorder import HistoryRecorder
+from ...models.schemas import BatchLetterRequest
 
 router = APIRouter(prefix="/api", tags=["vacancy"])
-hh_service = HHService()
 
-@router.get("/vacancies")
-async def get_vacancies(
+# Vacancy bodies are cached for a day; behind auth, so browsers only
+VACANCY_CACHE_CONTROL = "private, max-age=3600, stale-while-revalidate=86400"
+
+EXPORT_COLUMNS = (
+    "id", "name", "employer", "area", "salary_from", "salary_to", "salary_currency",
+    "salary_gross", "experience", "employment", "schedule", "published_at"
+)
+
+def search_filters(
     text: Optional[str] = Query(None),
     area: Optional[str] = Query(None),
     salary: Optional[int] = Query(None),
     only_with_salary: Optional[bool] = Query(False),
     experience: Optional[str] = Query(None),
     employment: Optional[str] = Query(None),
-    schedule: Optional[str] = Query(None),
-    page: int = Query(0),
-    per_page: int = Query(20, ge=20, le=100),
-    user_id: str = Depends(get_current_user_id)
-):
-    """Get vacancies list with details"""
-    params = {
-        "page": page,
-        "per_page": per_page
-    }
+    schedule: Optional[str] = Query(None)
+) -> Dict[str, Any]:
+    """HH search filters from query parameters"""
+    params = {}
     
     if text:
         params["text"] = text
@@ -44,25 +49,132 @@ async def get_vacancies(
     if schedule:
         params["schedule"] = schedule
     
+    return params
+
+def _csv_row(vacancy: Dict[str, Any]) -> list:
+    salary = vacancy.get("salary") or {}
+    return [
+        vacancy.get("id"),
+        vacancy.get("name"),
+        (vacancy.get("employer") or {}).get("name"),
+        (vacancy.get("area") or {}).get("name"),
+        salary.get("from"),
+        salary.get("to"),
+        salary.get("currency"),
+        salary.get("gross"),
+        (vacancy.get("experience") or {}).get("name"),
+        (vacancy.get("employment") or {}).get("name"),
+        (vacancy.get("schedule") or {}).get("name"),
+        vacancy.get("published_at")
+    ]
+
+@router.get("/vacancies")
+async def get_vacancies(
+    filters: Dict[str, Any] = Depends(search_filters),
+    page: int = Query(0),
+    per_page: int = Query(20, ge=20, le=100),
+    user_id: str = Depends(get_current_user_id),
+    hh_service: HHService = Depends(get_hh_service)
+):
+    """Get vacancies list with details"""
+    params = {
+        "page": page,
+        "per_page": per_page,
+        **filters
+    }
+    
     result = await hh_service.search_vacancies_with_details(user_id, params)
     
+    if page == 0:
+        await hh_service.record_search(params)
+    
     # Pre-load next page in background
     if result.get("items") and len(result["items"]) == per_page:
         await hh_service.warm_cache_next_page(user_id, params)
     
     return result
+
+@router.get("/vacancies/recommended")
+async def get_recommended_vacancies(
+    limit: int = Query(20, ge=1, le=100),
+    user_id: str = Depends(get_current_user_id),
+    hh_service: HHService = Depends(get_hh_service)
+):
+    """Get cached vacancies matching the skills of user's resume"""
+    return await hh_service.get_recommended_vacancies(user_id, limit)
+
+@router.get("/vacancies/ranked")
+async def get_ranked_vacancies(
+    filters: Dict[str, Any] = Depends(search_filters),
+    pages: int = Query(5, ge=1, le=20),
+    top: int = Query(20, ge=1, le=100),
+    with_match: bool = Query(False),
+    user_id: str = Depends(get_current_user_id),
+    hh_service: HHService = Depends(get_hh_service)
+):
+    """Get the best paid vacancies across several result pages, optionally weighed by match"""
+    return await hh_service.search_ranked(user_id, filters, pages, top, with_match)
+
+@router.get("/vacancies/export")
+async def export_vacancies(
+    filters: Dict[str, Any] = Depends(search_filters),
+    format: str = Query("jsonl", pattern="^(jsonl|csv)$"),
+    user_id: str = Depends(get_current_user_id),
+    hh_service: HHService = Depends(get_hh_service)
+):
+    """Export all search results with details, streamed as JSONL or CSV"""
+    vacancies = await hh_service.export_vacancies(user_id, filters)
+    
+    # A page that keeps failing ends the export with an error record, so a
+    # partial export is never mistaken for a complete one
+    if format == "jsonl":
+        async def body():
+            try:
+                async for vacancy in vacancies:
+                    yield json.dumps(vacancy, ensure_ascii=False) + "\n"
+            except ExportIncomplete as e:
+                yield json.dumps({"error": e.detail, "page": e.page}, ensure_ascii=False) + "\n"
+        
+        media_type = "application/x-ndjson"
+    else:
+        async def body():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            try:
+                async for vacancy in vacancies:
+                    writer.writerow(_csv_row(vacancy))
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            except ExportIncomplete as e:
+                writer.writerow(["#error", f"export incomplete, page {e.page} failed: {e.detail}"])
+                yield buffer.getvalue()
+        
+        media_type = "text/csv"
+    
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="vacancies.{format}"'}
+    )
+
 @router.get("/vacancy/{vacancy_id}")
 async def get_vacancy_details(
     vacancy_id: str,
-    user_id: str = Depends(get_current_user_id)
+    if_none_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id),
+    hh_service: HHService = Depends(get_hh_service)
 ):
     """Get full vacancy details"""
-    return await hh_service.get_vacancy_details(user_id, vacancy_id)
+    body, etag = await hh_service.get_vacancy_details_json(user_id, vacancy_id)
+    return cached_json_response(body, etag, if_none_match, VACANCY_CACHE_CONTROL)
 
 @router.post("/vacancy/{vacancy_id}/analyze")
 async def analyze_vacancy(
     vacancy_id: str,
-    user_id: str = Depends(get_current_user_id)
+    user_id: str = Depends(get_current_user_id),
+    hh_service: HHService = Depends(get_hh_service)
 ):
     """Analyze vacancy match"""
     return await hh_service.analyze_vacancy_match(user_id, vacancy_id)
@@ -70,30 +182,44 @@ async def analyze_vacancy(
 @router.post("/vacancy/{vacancy_id}/generate-letter")
 async def generate_letter(
     vacancy_id: str,
-    user_id: str = Depends(get_current_user_id)
+    user_id: str = Depends(get_current_user_id),
+    hh_service: HHService = Depends(get_hh_service)
 ):
     """Generate cover letter"""
     return await hh_service.generate_cover_letter(user_id, vacancy_id)
 
+@router.post("/vacancies/generate-letters")
+async def generate_letters(
+    request: BatchLetterRequest,
+    user_id: str = Depends(get_current_user_id),
+    hh_service: HHService = Depends(get_hh_service)
+):
+    """Generate cover letters for a shortlist, streamed as NDJSON in completion order"""
+    letters = await hh_service.generate_cover_letters(user_id, request.vacancy_ids)
+    
+    async def body():
+        async for letter in letters:
+            yield json.dumps(letter, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
 @router.post("/vacancy/{vacancy_id}/apply")
 async def apply_to_vacancy(
     vacancy_id: str,
     message: str,
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    hh_service: HHService = Depends(get_hh_service),
+    history_recorder: HistoryRecorder = Depends(get_history_recorder)
 ):
     """Apply to vacancy"""
     result = await hh_service.apply_to_vacancy(user_id, vacancy_id, message)
     
-    # Save to history
-    history = ResponseHistory(
-        user_id=user_id,
-        vacancy_id=vacancy_id,
-        vacancy_title=result.get("vacancy", {}).get("name", "Unknown"),
-        cover_letter=message,
-        match_score=0  # TODO: add score from analysis
+    # Save to history in the background; score and title are filled in there
+    await history_recorder.record(
+        user_id,
+        vacancy_id,
+        result.get("vacancy", {}).get("name", ""),
+        message
     )
-    db.add(history)
-    db.commit()
     
     return result
\ No newline at end of file
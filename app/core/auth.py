@@ -1,5 +1,8 @@
-from jose import jwt
+from jose import jwt, JWTError
+import hashlib
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -7,9 +10,14 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+ADMIN_USER_IDS = {uid.strip() for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip()}
 
 security = HTTPBearer()
 
+# Verified tokens: sha256(token) -> (user_id, exp timestamp), in LRU order
+_verified_tokens: "OrderedDict[bytes, tuple]" = OrderedDict()
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -21,23 +29,59 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
-    """Verify JWT token"""
+def _verify_payload(token: str) -> dict:
+    """Verify JWT signature and claims, return the payload"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials"
-            )
-        return user_id
-    except jwt.PyJWTError:
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials"
+        )
+    if payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
         )
+    return payload
+
+def verify_token(token: str):
+    """Verify JWT token"""
+    return _verify_payload(token)["sub"]
+
+def verify_token_cached(token: str):
+    """Verify JWT token, skipping signature checks for recently verified tokens.
+
+    Only successfully verified tokens are cached, and a cached entry is
+    dropped as soon as its exp passes, so expiry is still enforced.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = _verified_tokens.get(digest)
+    if cached is not None:
+        user_id, expires_at = cached
+        if expires_at > time.time():
+            _verified_tokens.move_to_end(digest)
+            return user_id
+        _verified_tokens.pop(digest, None)
 
-def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = _verify_payload(token)
+    user_id = payload["sub"]
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        _verified_tokens[digest] = (user_id, float(expires_at))
+        if len(_verified_tokens) > JWT_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+    return user_id
+
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user ID from JWT token"""
-    return verify_token(credentials.credentials)
\ No newline at end of file
+    return verify_token_cached(credentials.credentials)
+
+async def get_admin_user_id(user_id: str = Depends(get_current_user_id)):
+    """Get current user ID, requiring it to be listed in ADMIN_USER_IDS"""
+    if user_id not in ADMIN_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return user_id
\ No newline at end of file
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import os
+import httpx
+from fastapi import Request
+from .database import engine
+from .metrics import run_background_task
+from .profiling import LoopLagMonitor, SamplingProfiler
+from ..services.ai_service import AIService
+from ..services.auth_service import AuthService
+from ..services.cache_budget import CacheBudget
+from ..services.hh_client import HHClient, HTTP_TIMEOUT
+from ..services.hh_service import HHService
+from ..services.history_recorder import HistoryRecorder
+from ..services.redis_service import RedisService
+from ..services.reference_data import ReferenceData
+from ..services.token_manager import TokenManager
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_QUERIES = int(os.getenv("WARM_UP_QUERIES", "20"))
+WARM_UP_RETRY_DELAY = 5
+HTTP_MAX_CONNECTIONS = int(os.getenv("HH_MAX_CONNECTIONS", "100"))
+
+class Container:
+    """Process-wide services sharing one Redis pool, HTTP client and DB engine.
+
+    Built once per worker in the app lifespan; routers get services through
+    the get_* dependencies below.
+    """
+
+    def __init__(self):
+        self.engine = engine
+        self.http_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS
+            )
+        )
+        self.redis_service = RedisService()
+        self.hh_client = HHClient(self.http_client)
+        self.ai_service = AIService()
+        self.token_manager = TokenManager(self.redis_service, self.hh_client)
+        self.reference_data = ReferenceData(self.redis_service, self.hh_client)
+        self.hh_service = HHService(
+            self.redis_service, self.hh_client, self.ai_service, self.token_manager,
+            self.reference_data
+        )
+        self.auth_service = AuthService(self.hh_client, self.redis_service)
+        self.history_recorder = HistoryRecorder(self.redis_service)
+        self.cache_budget = CacheBudget(self.redis_service)
+        self.profiler = SamplingProfiler()
+        self.loop_monitor = LoopLagMonitor()
+        self.ready = False
+        self._tasks = set()
+
+    def spawn(self, coro) -> asyncio.Task:
+        """Run a coroutine for the lifetime of the container"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def start(self):
+        self.spawn(self.loop_monitor.run())
+        self.spawn(self.token_manager.run())
+        self.spawn(self.reference_data.run())
+        self.spawn(self.history_recorder.run())
+        self.spawn(self.cache_budget.run())
+        self.spawn(run_background_task("warm_up", self.warm_up()))
+
+    async def warm_up(self):
+        """Wait for Redis and reference data, pre-load popular searches, then report ready"""
+        while True:
+            try:
+                if not await self.redis_service.ping():
+                    raise ConnectionError("Redis is not reachable")
+                await self.reference_data.get_snapshot()
+                break
+            except Exception as e:
+                logger.warning("Start-up dependencies not ready: %s", e)
+                await asyncio.sleep(WARM_UP_RETRY_DELAY)
+        try:
+            warmed = await self.hh_service.warm_popular_queries(WARM_UP_QUERIES)
+            logger.info("Warm-up done, %d popular queries loaded", warmed)
+        except Exception as e:
+            # A cold cache is slower, not broken; serve traffic anyway
+            logger.warning("Warming popular queries failed: %s", e)
+        self.ready = True
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.http_client.aclose()
+        await self.redis_service.close()
+        self.engine.dispose()
+
+
+async def get_container(request: Request) -> Container:
+    return request.app.state.container
+
+async def get_hh_service(request: Request) -> HHService:
+    return request.app.state.container.hh_service
+
+async def get_auth_service(request: Request) -> AuthService:
+    return request.app.state.container.auth_service
+
+async def get_history_recorder(request: Request) -> HistoryRecorder:
+    return request.app.state.container.history_recorder
+
+async def get_cache_budget(request: Request) -> CacheBudget:
+    return request.app.state.container.cache_budget
@@ -0,0 +1,24 @@
+from typing import Optional, Union
+from fastapi import Response
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def cached_json_response(body: Union[str, bytes, memoryview], etag: str,
+                         if_none_match: Optional[str], cache_control: str) -> Response:
+    """Already serialized JSON response, or 304 when the client's copy is current"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if isinstance(body, str):
+        body = body.encode()
+    elif isinstance(body, memoryview):
+        body = body.tobytes()
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,219 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+# Buckets tuned for a web API: from sub-millisecond Redis calls to multi-second HH calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Known cache namespaces, longest prefix first
+CACHE_NAMESPACES = (
+    "vacancy:detail",
+    "vacancy:full",
+    "vacancy:ranked",
+    "resume",
+    "analysis",
+    "dictionaries",
+    "areas",
+    "token",
+    "refresh_token",
+)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of API requests",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+HH_REQUEST_LATENCY = Histogram(
+    "hh_request_duration_seconds",
+    "Latency of HH API calls",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+
+HH_REQUEST_ERRORS = Counter(
+    "hh_request_errors_total",
+    "Failed HH API calls",
+    ["endpoint"],
+)
+
+REDIS_OPERATION_LATENCY = Histogram(
+    "redis_operation_duration_seconds",
+    "Latency of Redis operations",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+REDIS_ERRORS = Counter(
+    "redis_errors_total",
+    "Failed Redis operations",
+    ["operation"],
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Latency of database queries",
+    ["statement"],
+    buckets=LATENCY_BUCKETS,
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by namespace and result",
+    ["namespace", "result"],
+)
+
+SEMAPHORE_WAIT = Histogram(
+    "semaphore_wait_seconds",
+    "Time spent waiting for a concurrency slot",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+
+BACKGROUND_TASKS_STARTED = Counter(
+    "background_tasks_started_total",
+    "Background tasks scheduled",
+    ["task"],
+)
+
+BACKGROUND_TASKS_FAILED = Counter(
+    "background_tasks_failed_total",
+    "Background tasks that raised",
+    ["task"],
+)
+
+BACKGROUND_TASKS_IN_PROGRESS = Gauge(
+    "background_tasks_in_progress",
+    "Background tasks currently running",
+    ["task"],
+    multiprocess_mode="livesum",
+)
+
+CACHE_NAMESPACE_KEYS = Gauge(
+    "cache_namespace_keys",
+    "Estimated number of keys in a cache namespace",
+    ["namespace"],
+    multiprocess_mode="max",
+)
+
+CACHE_NAMESPACE_BYTES = Gauge(
+    "cache_namespace_bytes",
+    "Estimated memory used by a cache namespace",
+    ["namespace"],
+    multiprocess_mode="max",
+)
+
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Cache entries evicted to stay within a namespace budget",
+    ["namespace"],
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of event loop ticks behind schedule",
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def cache_namespace(key: str) -> str:
+    """Map a cache key to its namespace label"""
+    for namespace in CACHE_NAMESPACES:
+        if key == namespace or key.startswith(namespace + ":"):
+            return namespace
+    return "other"
+
+
+def record_cache_lookup(key: str, hit: bool):
+    """Count a cache hit or miss for the key's namespace"""
+    CACHE_REQUESTS.labels(cache_namespace(key), "hit" if hit else "miss").inc()
+
+
+def timed(histogram: Histogram, errors: Counter = None, **labels):
+    """Decorator observing the duration of an async function"""
+    def decorator(func):
+        observer = histogram.labels(**labels)
+        error_counter = errors.labels(**labels) if errors is not None else None
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                if error_counter is not None:
+                    error_counter.inc()
+                raise
+            finally:
+                observer.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def observe(histogram: Histogram, **labels):
+    """Context manager observing the duration of a block"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+
+async def run_background_task(name: str, coro):
+    """Await a coroutine while reflecting its lifetime in background task metrics"""
+    BACKGROUND_TASKS_STARTED.labels(name).inc()
+    in_progress = BACKGROUND_TASKS_IN_PROGRESS.labels(name)
+    in_progress.inc()
+    try:
+        return await coro
+    except Exception:
+        BACKGROUND_TASKS_FAILED.labels(name).inc()
+        raise
+    finally:
+        in_progress.dec()
+
+
+def render_metrics() -> tuple:
+    """Render metrics in Prometheus text format.
+
+    When PROMETHEUS_MULTIPROC_DIR is set (gunicorn with several workers),
+    values are aggregated across all worker processes.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def instrument_engine(engine):
+    """Attach query timing listeners to a SQLAlchemy engine"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start_time"].pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_LATENCY.labels(verb).observe(time.perf_counter() - start)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        starts = context.connection.info.get("query_start_time") if context.connection else None
+        if starts:
+            starts.pop()
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+from .metrics import EVENT_LOOP_LAG
+
+logger = logging.getLogger("app.loop_lag")
+
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")) / 1000
+LOOP_LAG_INTERVAL = 0.05
+LOOP_LAG_HISTORY = 100
+MAX_STACK_DEPTH = 128
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}:{code.co_name}"
+
+
+def collapse_stack(frame: Optional[FrameType]) -> List[str]:
+    """Frame names from the outermost call to frame"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return names[::-1]
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling the stacks of all threads.
+
+    Samples are taken from a separate thread with sys._current_frames, so
+    the profiled code runs unmodified; the cost is one stack walk per
+    thread per interval. Output is in collapsed-stack format, one
+    "frame;frame;frame count" line per distinct stack, as read by
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def _sample(self, seconds: float) -> Counter:
+        own_thread = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                thread_name = names.get(thread_id) or str(thread_id)
+                stacks[";".join([thread_name, *collapse_stack(frame)])] += 1
+            time.sleep(self.interval)
+        return stacks
+
+    async def profile(self, seconds: float) -> str:
+        """Sample for the given time, return collapsed stacks"""
+        async with self._lock:
+            stacks = await asyncio.to_thread(self._sample, seconds)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class LoopLagMonitor:
+    """Records intervals where the event loop was blocked, with the culprit stack.
+
+    A task on the loop ticks every LOOP_LAG_INTERVAL; the lateness of each
+    tick is the loop lag. A watchdog thread notices a missed tick while the
+    loop is still blocked and captures the loop thread's stack, which is
+    attached to the interval once the loop catches up.
+    """
+
+    def __init__(self, threshold: float = LOOP_LAG_THRESHOLD):
+        self.threshold = threshold
+        self.events: deque = deque(maxlen=LOOP_LAG_HISTORY)
+        self._loop_thread: Optional[int] = None
+        self._heartbeat = time.perf_counter()
+        self._stall_stack: Optional[List[str]] = None
+        self._stopped = threading.Event()
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 2):
+            blocked_for = time.perf_counter() - self._heartbeat - LOOP_LAG_INTERVAL
+            if blocked_for > self.threshold and self._stall_stack is None:
+                frame = sys._current_frames().get(self._loop_thread)
+                self._stall_stack = collapse_stack(frame)
+
+    def _record(self, lag: float):
+        stack = self._stall_stack or []
+        self.events.append({
+            "at": datetime.utcnow().isoformat(),
+            "lag_ms": round(lag * 1000, 1),
+            "stack": stack
+        })
+        logger.warning("Event loop blocked for %.0fms in %s", lag * 1000, ";".join(stack) or "unknown")
+
+    async def run(self):
+        """Measure loop lag, runs until cancelled"""
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                self._heartbeat = time.perf_counter()
+                # Cleared after the heartbeat moves, so a late capture can't leak into the next interval
+                self._stall_stack = None
+                await asyncio.sleep(LOOP_LAG_INTERVAL)
+                lag = max(time.perf_counter() - self._heartbeat - LOOP_LAG_INTERVAL, 0)
+                EVENT_LOOP_LAG.observe(lag)
+                if lag > self.threshold:
+                    self._record(lag)
+        finally:
+            self._stopped.set()
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """Recorded blocking intervals, newest first"""
+        return list(reversed(self.events))
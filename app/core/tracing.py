@@ -0,0 +1,204 @@
+import functools
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - optional dependency
+    otel_trace = None
+
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "1000"))
+MAX_SPANS_PER_TRACE = int(os.getenv("TRACE_MAX_SPANS", "1000"))
+
+logger = logging.getLogger("app.slow_requests")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_otel_tracer = otel_trace.get_tracer("hhback") if otel_trace else None
+
+
+class Span:
+    """In-process span, mirrored to OpenTelemetry when it is installed"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent", "attributes", "children",
+        "start", "end", "error", "_root", "_span_count", "_dropped", "_otel",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"] = None,
+                 trace_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else (trace_id or secrets.token_hex(16))
+        self.span_id = secrets.token_hex(8)
+        self.attributes = attributes or {}
+        self.children: List["Span"] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+        self._root = parent._root if parent else self
+        self._span_count = 1
+        self._dropped = 0
+        self._otel = None
+
+        if _otel_tracer is not None:
+            context = None
+            if parent is not None and parent._otel is not None:
+                context = otel_trace.set_span_in_context(parent._otel)
+            self._otel = _otel_tracer.start_span(name, context=context, attributes=self.attributes)
+
+        if parent is not None:
+            root = self._root
+            if root._span_count < MAX_SPANS_PER_TRACE:
+                root._span_count += 1
+                parent.children.append(self)
+            else:
+                root._dropped += 1
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.end = time.perf_counter()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self._otel is not None:
+            if error is not None:
+                self._otel.record_exception(error)
+                self._otel.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR))
+            self._otel.end()
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the span and its children, with self time excluding children"""
+        children = [child.to_dict() for child in self.children]
+        duration = self.duration_ms
+        data = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "start_ms": round((self.start - self._root.start) * 1000, 3),
+            "duration_ms": round(duration, 3),
+            "self_ms": round(max(duration - sum(c["duration_ms"] for c in children), 0.0), 3),
+        }
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.error:
+            data["error"] = self.error
+        if children:
+            data["children"] = children
+        return data
+
+
+def get_request_id() -> Optional[str]:
+    """Request id of the request being handled, if any"""
+    return _request_id.get()
+
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """Open a child span of the current span.
+
+    Work that outlives its request (e.g. background cache warming) starts a
+    detached trace instead of growing an already finished one.
+    """
+    parent = _current_span.get()
+    if parent is not None and parent._root.end is not None:
+        parent = None
+    span = Span(name, parent=parent, attributes=attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.finish(e)
+        raise
+    else:
+        span.finish()
+    finally:
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """Decorator running an async function inside a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with start_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _parse_traceparent(header: Optional[str]) -> Optional[str]:
+    """Extract trace id from a W3C traceparent header"""
+    if not header:
+        return None
+    parts = header.split("-")
+    if len(parts) == 4 and len(parts[1]) == 32:
+        return parts[1]
+    return None
+
+
+@contextmanager
+def start_request_trace(method: str, path: str, request_id: str,
+                        traceparent: Optional[str] = None):
+    """Open the root span of a request and bind its request id"""
+    span = Span(
+        f"{method} {path}",
+        trace_id=_parse_traceparent(traceparent),
+        attributes={"http.method": method, "http.target": path, "request_id": request_id},
+    )
+    span_token = _current_span.set(span)
+    request_token = _request_id.set(request_id)
+    try:
+        yield span
+    except BaseException as e:
+        span.finish(e)
+        raise
+    else:
+        span.finish()
+    finally:
+        _current_span.reset(span_token)
+        _request_id.reset(request_token)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request id to log records as request_id"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get() or "-"
+        return True
+
+
+async def attach_request_id(request):
+    """httpx request hook forwarding the current request id upstream"""
+    request_id = _request_id.get()
+    if request_id:
+        request.headers["X-Request-ID"] = request_id
+
+
+def new_request_id() -> str:
+    return secrets.token_hex(8)
+
+
+def log_if_slow(span: Span, request_id: str):
+    """Log the full span tree of a request that exceeded the threshold"""
+    if span.duration_ms < SLOW_REQUEST_THRESHOLD_MS:
+        return
+    record = {
+        "event": "slow_request",
+        "request_id": request_id,
+        "trace_id": span.trace_id,
+        "duration_ms": round(span.duration_ms, 3),
+        "threshold_ms": SLOW_REQUEST_THRESHOLD_MS,
+        "dropped_spans": span._dropped,
+        "trace": span.to_dict(),
+    }
+    logger.warning(json.dumps(record, ensure_ascii=False, default=str))
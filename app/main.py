@@ -1,17 +1,43 @@
-from fastapi import FastAPI
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse
 
-from .core.database import engine
 from .api.routers.user import router as user_router
 from .api.routers.auth import router as auth_router  
 from .api.routers.vacancy import router as vacancy_router
-from .models.db_models import Base
+from .api.routers.admin import router as admin_router
+from .api.routers.debug import router as debug_router
+from .core.container import Container, get_container
+from .core.metrics import HTTP_REQUEST_LATENCY, render_metrics
+from .core.tracing import RequestIdFilter, start_request_trace, new_request_id, log_if_slow
+from .services.hh_service import request_token_scope
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+)
+for handler in logging.getLogger().handlers:
+    handler.addFilter(RequestIdFilter())
+# One line per HH call is too chatty at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Tables are created by `python -m app.manage init-db`, not on worker boot
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    container = Container()
+    app.state.container = container
+    await container.start()
+    try:
+        yield
+    finally:
+        await container.close()
 
-app = FastAPI(title="HH Job Application API", version="1.0.0")
+app = FastAPI(title="HH Job Application API", version="1.0.0", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -22,11 +48,81 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_LATENCY.labels(
+            request.method,
+            route.path if route else "unmatched",
+            str(status)
+        ).observe(time.perf_counter() - start)
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    span = None
+    try:
+        with start_request_trace(
+            request.method,
+            request.url.path,
+            request_id,
+            request.headers.get("traceparent")
+        ) as span:
+            response = await call_next(request)
+            span.attributes["http.status_code"] = response.status_code
+    finally:
+        if span is not None:
+            route = request.scope.get("route")
+            if route:
+                span.name = f"{request.method} {route.path}"
+            log_if_slow(span, request_id)
+
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+class TokenScopeMiddleware:
+    """Opens a per-request HH token scope; plain ASGI, so no extra task hop"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with request_token_scope():
+            await self.app(scope, receive, send)
+
+app.add_middleware(TokenScopeMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(vacancy_router)
+app.include_router(admin_router)
+app.include_router(debug_router)
 
 @app.get("/")
 async def root():
-    return {"message": "HH Job Application API"}
\ No newline at end of file
+    return {"message": "HH Job Application API"}
+
+@app.get("/ready", include_in_schema=False)
+async def ready(container: Container = Depends(get_container)):
+    """Readiness probe, passes once warm-up has finished and while Redis is reachable"""
+    if not container.ready:
+        return JSONResponse({"status": "warming_up"}, status_code=503)
+    if not await container.redis_service.ping():
+        return JSONResponse({"status": "redis_unavailable"}, status_code=503)
+    return {"status": "ready"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,92 @@
+"""Maintenance commands: python -m app.manage <command>"""
+import argparse
+
+from sqlalchemy import inspect, text
+
+from .core.database import engine, SessionLocal
+from .models.db_models import Base
+from .services.history_stats import backfill
+
+
+# Columns added after the first release; create_all does not alter existing tables
+ADDED_COLUMNS = (
+    ("response_history", "employer_name", "VARCHAR"),
+    ("response_history", "area_name", "VARCHAR"),
+    ("response_stats", "scored_count", "INTEGER NOT NULL DEFAULT 0"),
+)
+# Columns that became nullable after the first release
+NULLABLE_COLUMNS = (
+    ("response_history", "match_score"),
+)
+
+
+def _add_columns():
+    with engine.begin() as conn:
+        for table, column, column_type in ADDED_COLUMNS:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}"))
+        for table, column in NULLABLE_COLUMNS:
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} DROP NOT NULL"))
+
+
+def _count_duplicate_history() -> int:
+    """History rows the unique (user_id, vacancy_id) index would reject, 0 once it exists"""
+    indexes = {index["name"] for index in inspect(engine).get_indexes("response_history")}
+    if "uq_response_history_user_vacancy" in indexes:
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT count(*) - count(DISTINCT (user_id, vacancy_id)) FROM response_history"
+        )).scalar()
+
+
+def init_db(args):
+    """Create database tables and indexes"""
+    Base.metadata.create_all(bind=engine)
+    _add_columns()
+    duplicates = _count_duplicate_history()
+    if duplicates:
+        raise SystemExit(
+            f"response_history has {duplicates} duplicate (user_id, vacancy_id) rows; "
+            "run python -m app.manage dedupe-history to remove them, then init-db again"
+        )
+    # create_all skips indexes of tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    print("Tables created")
+
+
+def dedupe_history(args):
+    """Delete duplicate applications, keeping the earliest per (user_id, vacancy_id)"""
+    with engine.begin() as conn:
+        removed = conn.execute(text(
+            "DELETE FROM response_history a USING response_history b "
+            "WHERE a.user_id = b.user_id AND a.vacancy_id = b.vacancy_id AND a.id > b.id"
+        )).rowcount
+    print(f"Removed {removed} duplicate history rows; run backfill-stats to recount the rollups")
+
+
+def backfill_stats(args):
+    """Rebuild application statistics rollups from response_history"""
+    db = SessionLocal()
+    try:
+        rows = backfill(db)
+    finally:
+        db.close()
+    print(f"Rebuilt {rows} rollup rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("init-db", help=init_db.__doc__).set_defaults(func=init_db)
+    commands.add_parser("dedupe-history", help=dedupe_history.__doc__).set_defaults(func=dedupe_history)
+    commands.add_parser("backfill-stats", help=backfill_stats.__doc__).set_defaults(func=backfill_stats)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
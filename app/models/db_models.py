@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
@@ -6,12 +6,36 @@ Base = declarative_base()
 
 class ResponseHistory(Base):
     __tablename__ = "response_history"
+    __table_args__ = (
+        # One application per vacancy; makes history writes idempotent
+        Index("uq_response_history_user_vacancy", "user_id", "vacancy_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, nullable=False, index=True)
     vacancy_id = Column(String, nullable=False)
     vacancy_title = Column(String, nullable=False)
     cover_letter = Column(Text, nullable=False)
-    match_score = Column(Integer, nullable=False)
+    # NULL when no analysis was cached at application time
+    match_score = Column(Integer, nullable=True)
+    employer_name = Column(String, nullable=True)
+    area_name = Column(String, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
-    sent_at = Column(DateTime, nullable=True)
\ No newline at end of file
+    sent_at = Column(DateTime, nullable=True)
+
+class ResponseStats(Base):
+    """Per-user application counters, updated with every history insert"""
+    __tablename__ = "response_stats"
+    __table_args__ = (
+        Index("ix_response_stats_top", "user_id", "bucket", "count"),
+    )
+    
+    user_id = Column(String, primary_key=True)
+    # total, day, week, employer or area
+    bucket = Column(String, primary_key=True)
+    # Date of the day/week start, employer/area name, "" for total
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    # Applications with a match score, the ones score_sum adds up
+    scored_count = Column(Integer, nullable=False, default=0, server_default="0")
+    score_sum = Column(Integer, nullable=False, default=0)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -9,6 +9,9 @@ class RefreshTokenRequest(BaseModel):
 class ApplyRequest(BaseModel):
     message: str
 
+class BatchLetterRequest(BaseModel):
+    vacancy_ids: List[str] = Field(..., min_length=1, max_length=50)
+
 # Response models
 class AuthResponse(BaseModel):
     token: str
@@ -33,13 +36,31 @@ class ResponseHistoryItem(BaseModel):
     vacancy_id: str
     vacancy_title: str
     cover_letter: str
-    match_score: int
+    match_score: Optional[int] = None
     created_at: datetime
     sent_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class HistoryStats(BaseModel):
+    total: int
+    average_match_score: Optional[float] = None
+    per_day: List[Dict[str, Any]]
+    per_week: List[Dict[str, Any]]
+    top_employers: List[Dict[str, Any]]
+    top_areas: List[Dict[str, Any]]
+
+class CacheNamespaceUsage(BaseModel):
+    namespace: str
+    keys: int
+    bytes: int
+    sampled: int
+    budget_bytes: Optional[int] = None
+
+class CacheStats(BaseModel):
+    namespaces: List[CacheNamespaceUsage]
+
 class MatchAnalysis(BaseModel):
     score: int
     strengths: List[str]
@@ -16,8 +16,17 @@ class AIService:
             "recommendation": "Хорошее соответствие, рекомендуем откликнуться"
         }
     
-    async def generate_cover_letter(self, resume: dict, vacancy: dict) -> dict:
+    def prepare_resume(self, resume: dict) -> dict:
+        """Extract the resume fields letters are built from, once per resume"""
+        return {
+            "experience_years": (resume.get('total_experience') or {}).get('months', 0) // 12,
+            "top_skills": ', '.join((resume.get('skill_set') or ['Профессиональные навыки'])[:3]),
+            "full_name": f"{resume.get('first_name', '')} {resume.get('last_name', '')}"
+        }
+    
+    async def generate_cover_letter(self, resume: dict, vacancy: dict, profile: dict = None) -> dict:
         """Mock cover letter generation"""
+        profile = profile or self.prepare_resume(resume)
         company = vacancy.get("employer", {}).get("name", "вашей компании")
         position = vacancy.get("name", "должность")
         
@@ -25,15 +34,15 @@ class AIService:
 
 Меня заинтересовала вакансия "{position}" в {company}.
 
-Мой опыт работы в течение {resume.get('total_experience', {}).get('months', 0) // 12} лет позволит мне эффективно решать поставленные задачи. 
+Мой опыт работы в течение {profile['experience_years']} лет позволит мне эффективно решать поставленные задачи. 
 
 Ключевые навыки, которые помогут в этой роли:
-- {', '.join(resume.get('skill_set', ['Профессиональные навыки'])[:3])}
+- {profile['top_skills']}
 
 Буду рад обсудить детали сотрудничества на собеседовании.
 
 С уважением,
-{resume.get('first_name', '')} {resume.get('last_name', '')}"""
+{profile['full_name']}"""
         
         return {
             "content": letter,
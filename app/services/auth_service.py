@@ -5,9 +5,9 @@ from ..core.auth import create_access_token
 from ..models.schemas import AuthResponse
 
 class AuthService:
-    def __init__(self):
-        self.hh_client = HHClient()
-        self.redis_service = RedisService()
+    def __init__(self, hh_client: HHClient = None, redis_service: RedisService = None):
+        self.hh_client = hh_client or HHClient()
+        self.redis_service = redis_service or RedisService()
 
     async def handle_oauth_callback(self, code: str) -> AuthResponse:
         """Handle HH OAuth callback"""
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import math
+import os
+from typing import Any, Dict, List
+from .redis_service import RedisService, EVICTABLE_NAMESPACES
+from ..core.metrics import (
+    run_background_task,
+    CACHE_EVICTIONS,
+    CACHE_NAMESPACE_BYTES,
+    CACHE_NAMESPACE_KEYS,
+)
+from ..core.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+BUDGET_INTERVAL = int(os.getenv("CACHE_BUDGET_INTERVAL", "60"))
+SAMPLE_SIZE = int(os.getenv("CACHE_BUDGET_SAMPLE_SIZE", "64"))
+# Evict down to this fraction of the budget so we don't trim on every round
+EVICTION_TARGET = 0.9
+EVICTION_BATCH = 500
+
+_UNITS = {"b": 1, "kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3}
+
+
+def parse_budgets(value: str) -> Dict[str, int]:
+    """Parse "vacancy:full=512mb,analysis=64mb" into bytes per namespace"""
+    budgets = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        namespace, _, size = item.strip().rpartition("=")
+        size = size.strip().lower()
+        unit = next((u for u in ("kb", "mb", "gb", "b") if size.endswith(u)), "")
+        try:
+            amount = float(size[:-len(unit)] if unit else size) * _UNITS.get(unit, 1)
+        except ValueError:
+            logger.warning("Ignoring malformed cache budget %r", item)
+            continue
+        if namespace not in EVICTABLE_NAMESPACES:
+            logger.warning("Ignoring cache budget for non-evictable namespace %r", namespace)
+            continue
+        budgets[namespace] = int(amount)
+    return budgets
+
+
+class CacheBudget:
+    """Keeps evictable cache namespaces within their memory budgets.
+
+    RedisService.set_json indexes every evictable key in its namespace's
+    sharded sorted sets scored by expiry. Usage is estimated from ZCARD and the
+    MEMORY USAGE of a random sample; when a namespace is over budget, the
+    entries closest to expiry (the least left to give) are evicted first.
+    One worker at a time enforces, under a Redis lock.
+    """
+
+    def __init__(self, redis_service: RedisService = None, budgets: Dict[str, int] = None):
+        self.redis_service = redis_service or RedisService()
+        self.budgets = budgets if budgets is not None else parse_budgets(os.getenv("CACHE_BUDGETS", ""))
+
+    @traced("CacheBudget.usage")
+    async def usage(self) -> List[Dict[str, Any]]:
+        """Estimated key count and bytes for every evictable namespace"""
+        results = await asyncio.gather(*(
+            self.redis_service.cache_usage(namespace, SAMPLE_SIZE) for namespace in EVICTABLE_NAMESPACES
+        ))
+        report = []
+        for namespace, usage in zip(EVICTABLE_NAMESPACES, results):
+            CACHE_NAMESPACE_KEYS.labels(namespace).set(usage["keys"])
+            CACHE_NAMESPACE_BYTES.labels(namespace).set(usage["bytes"])
+            report.append({"namespace": namespace, "budget_bytes": self.budgets.get(namespace), **usage})
+        return report
+
+    @traced("CacheBudget.enforce")
+    async def enforce(self) -> int:
+        """Evict from namespaces over budget, return the number of evicted entries"""
+        owner = await self.redis_service.acquire_lock("cache_budget", BUDGET_INTERVAL)
+        if not owner:
+            return 0
+        try:
+            evicted = 0
+            for usage in await self.usage():
+                budget = usage["budget_bytes"]
+                if budget is None or usage["bytes"] <= budget or not usage["keys"]:
+                    continue
+                average = usage["bytes"] / usage["keys"]
+                excess = math.ceil((usage["bytes"] - budget * EVICTION_TARGET) / average)
+                namespace = usage["namespace"]
+                while excess > 0:
+                    popped, removed = await self.redis_service.evict_cache(
+                        namespace, min(excess, EVICTION_BATCH)
+                    )
+                    if not popped:
+                        break
+                    # Stale index entries freed nothing and do not count
+                    CACHE_EVICTIONS.labels(namespace).inc(removed)
+                    evicted += removed
+                    excess -= removed
+            return evicted
+        finally:
+            await self.redis_service.release_lock("cache_budget", owner)
+
+    async def run(self):
+        """Enforcement loop, runs until cancelled"""
+        while True:
+            try:
+                evicted = await run_background_task("cache_budget", self.enforce())
+                if evicted:
+                    logger.info("Evicted %d cache entries over budget", evicted)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache budget round failed: %s", e)
+            await asyncio.sleep(BUDGET_INTERVAL)
@@ -1,164 +1,212 @@
 import httpx
 import os
+from typing import Optional
 from fastapi import HTTPException
+from ..core.metrics import timed, HH_REQUEST_LATENCY, HH_REQUEST_ERRORS
+from ..core.tracing import attach_request_id, traced
+
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+class TokenRefreshError(HTTPException):
+    """HH did not refresh a token; keeps HH's status and OAuth error code"""
+
+    def __init__(self, status_code: int, error: Optional[str], description: str):
+        super().__init__(status_code=status_code, detail=f"Token refresh error: {description}")
+        self.error = error
+        self.description = description
+
+    @property
+    def premature(self) -> bool:
+        """HH refused because the access token has not expired yet"""
+        # HH only refreshes expired tokens and answers earlier attempts with invalid_grant
+        return self.error == "invalid_grant" and self.description == "token not expired"
+
+    @property
+    def revoked(self) -> bool:
+        """The refresh token is dead for good and the user has to log in again"""
+        return self.error == "invalid_grant" and not self.premature
 
 class HHClient:
-    def __init__(self):
+    def __init__(self, http_client: httpx.AsyncClient = None):
+        self.http_client = http_client or httpx.AsyncClient(timeout=HTTP_TIMEOUT)
+        if attach_request_id not in self.http_client.event_hooks["request"]:
+            self.http_client.event_hooks["request"].append(attach_request_id)
         self.client_id = os.getenv("HH_CLIENT_ID")
         self.client_secret = os.getenv("HH_CLIENT_SECRET")
-        self.base_url = "https://api.hh.ru"
+        self.base_url = os.getenv("HH_API_URL", "https://api.hh.ru")
+        self.oauth_url = os.getenv("HH_OAUTH_URL", "https://hh.ru/oauth/token")
     
+    def _headers(self, token: Optional[str]) -> dict:
+        """Authorization headers; public endpoints may be called without a token"""
+        return {"Authorization": f"Bearer {token}"} if token else {}
+
+    async def close(self):
+        await self.http_client.aclose()
+
+    @traced("HHClient.get_dictionaries")
+    @timed(HH_REQUEST_LATENCY, HH_REQUEST_ERRORS, endpoint="dictionaries")
     async def get_dictionaries(self):
         """Get HH dictionaries"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/dictionaries")
-            response.raise_for_status()
-            return response.json()
+        response = await self.http_client.get(f"{self.base_url}/dictionaries")
+        response.raise_for_status()
+        return response.json()
     
+    @traced("HHClient.get_areas")
+    @timed(HH_REQUEST_LATENCY, HH_REQUEST_ERRORS, endpoint="areas")
     async def get_areas(self):
         """Get areas (cities/regions)"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/areas")
-            response.raise_for_status()
-            return response.json()
+        response = await self.http_client.get(f"{self.base_url}/areas")
+        response.raise_for_status()
+        return response.json()
     
+    @traced("HHClient.exchange_code_for_token")
+    @timed(HH_REQUEST_LATENCY, HH_REQUEST_ERRORS, endpoint="oauth_token")
     async def exchange_code_for_token(self, code: str) -> dict:
         """Exchange OAuth code for access token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://hh.ru/oauth/token",
-                data={
-                    "grant_type": "authorization_code",
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                    "code": code,
-                    "redirect_uri": "http://localhost:3000"
-                }
+        response = await self.http_client.post(
+            self.oauth_url,
+            data={
+                "grant_type": "authorization_code",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "code": code,
+                "redirect_uri": "http://localhost:3000"
+            }
+        )
+        
+        if response.status_code != 200:
+            error_data = response.json()
+            raise HTTPException(
+                status_code=400,
+                detail=f"HH OAuth error: {error_data.get('error_description', 'Unknown error')}"
             )
-            
-            if response.status_code != 200:
-                error_data = response.json()
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"HH OAuth error: {error_data.get('error_description', 'Unknown error')}"
-                )
-            
-            data = response.json()
-            if "access_token" not in data:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Invalid response from HH: no access_token"
-                )
-            
-            return data
+        
+        data = response.json()
+        if "access_token" not in data:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid response from HH: no access_token"
+            )
+        
+        return data
     
+    @traced("HHClient.refresh_access_token")
+    @timed(HH_REQUEST_LATENCY, HH_REQUEST_ERRORS, endpoint="oauth_refresh")
     async def refresh_access_token(self, refresh_token: str) -> dict:
         """Refresh access token using refresh token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://hh.ru/oauth/token",
-                data={
-                    "grant_type": "refresh_token",
-                    "refresh_token": refresh_token
-                }
-            )
-            
-            if response.status_code != 200:
+        response = await self.http_client.post(
+            self.oauth_url,
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token
+            }
+        )
+        
+        if response.status_code != 200:
+            try:
                 error_data = response.json()
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Token refresh error: {error_data.get('error_description', 'Unknown error')}"
-                )
-            
-            return response.json()
+            except ValueError:
+                error_data = {}
+            raise TokenRefreshError(
+                response.status_code,
+                error_data.get("error"),
+                error_data.get("error_description", "Unknown error")
+            )
+        
+        return response.json()
     
+    @traced("HHClient.get_user_info")
+    @timed(HH_REQUEST_LATENCY, HH_REQUEST_ERRORS, endpoint="me")
     async def get_user_info(self, token: str) -> dict:
         """Get user information"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/me",
-                headers={"Authorization": f"Bearer {token}"}
+        response = await self.http_client.get(
+            f"{self.base_url}/me",
+            headers=self._headers(token)
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="Failed to get user info from HH"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="Failed to get user info from HH"
-                )
-            
-            return response.json()
+        
+        return response.json()
     
+    @traced("HHClient.get_resume")
+    @timed(HH_REQUEST_LATENCY, HH_REQUEST_ERRORS, endpoint="resumes_mine")
     async def get_resume(self, token: str) -> dict:
         """Get user's resume"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/resumes/mine",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            
-            if response.status_code != 200:
-                return None
-                
-            resume_list = response.json()
-            
-            if resume_list.get("items"):
-                resume_id = resume_list["items"][0]["id"]
-                response = await client.get(
-                    f"{self.base_url}/resumes/{resume_id}",
-                    headers={"Authorization": f"Bearer {token}"}
-                )
-                if response.status_code == 200:
-                    return response.json()
+        response = await self.http_client.get(
+            f"{self.base_url}/resumes/mine",
+            headers=self._headers(token)
+        )
+        
+        if response.status_code != 200:
             return None
+            
+        resume_list = response.json()
+        
+        if resume_list.get("items"):
+            resume_id = resume_list["items"][0]["id"]
+            response = await self.http_client.get(
+                f"{self.base_url}/resumes/{resume_id}",
+                headers=self._headers(token)
+            )
+            if response.status_code == 200:
+                return response.json()
+        return None
     
-    async def search_vacancies(self, token: str, params: dict) -> dict:
+    @traced("HHClient.search_vacancies")
+    @timed(HH_REQUEST_LATENCY, HH_REQUEST_ERRORS, endpoint="vacancies")
+    async def search_vacancies(self, token: Optional[str], params: dict) -> dict:
         """Search vacancies"""
-        async with httpx.AsyncClient() as client:
-            if 'per_page' not in params:
-                params['per_page'] = 50
-            if 'page' not in params:
-                params['page'] = 0
-                
-            response = await client.get(
-                f"{self.base_url}/vacancies",
-                params=params,
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            return response.json()
+        if 'per_page' not in params:
+            params['per_page'] = 50
+        if 'page' not in params:
+            params['page'] = 0
+            
+        response = await self.http_client.get(
+            f"{self.base_url}/vacancies",
+            params=params,
+            headers=self._headers(token)
+        )
+        response.raise_for_status()
+        return response.json()
     
-    async def get_vacancy(self, token: str, vacancy_id: str) -> dict:
+    @traced("HHClient.get_vacancy")
+    @timed(HH_REQUEST_LATENCY, HH_REQUEST_ERRORS, endpoint="vacancy")
+    async def get_vacancy(self, token: Optional[str], vacancy_id: str) -> dict:
         """Get vacancy details"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/vacancies/{vacancy_id}",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self.http_client.get(
+            f"{self.base_url}/vacancies/{vacancy_id}",
+            headers=self._headers(token)
+        )
+        response.raise_for_status()
+        return response.json()
     
+    @traced("HHClient.apply_to_vacancy")
+    @timed(HH_REQUEST_LATENCY, HH_REQUEST_ERRORS, endpoint="negotiations")
     async def apply_to_vacancy(self, token: str, vacancy_id: str, message: str) -> dict:
         """Apply to vacancy"""
-        async with httpx.AsyncClient() as client:
-            resume = await self.get_resume(token)
-            if not resume:
-                raise HTTPException(400, "No resume found")
-            
-            response = await client.post(
-                f"{self.base_url}/negotiations",
-                headers={"Authorization": f"Bearer {token}"},
-                json={
-                    "vacancy_id": vacancy_id,
-                    "resume_id": resume["id"],
-                    "message": message
-                }
+        resume = await self.get_resume(token)
+        if not resume:
+            raise HTTPException(400, "No resume found")
+        
+        response = await self.http_client.post(
+            f"{self.base_url}/negotiations",
+            headers=self._headers(token),
+            json={
+                "vacancy_id": vacancy_id,
+                "resume_id": resume["id"],
+                "message": message
+            }
+        )
+        
+        if response.status_code != 201:
+            error = response.json()
+            raise HTTPException(
+                status_code=400,
+                detail=error.get("description", "Failed to apply")
             )
             
-            if response.status_code != 201:
-                error = response.json()
-                raise HTTPException(
-                    status_code=400,
-                    detail=error.get("description", "Failed to apply")
-                )
-                
-            return response.json()
\ No newline at end of file
+        return response.json()
\ No newline at end of file
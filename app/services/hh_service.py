@@ -1,38 +1,130 @@
+import hashlib
 import json
+import logging
 import re
 import asyncio
-from typing import Dict, Any, Optional, List
+import time
+import httpx
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
 from fastapi import HTTPException
 from .hh_client import HHClient
-from .redis_service import RedisService
+from .redis_service import RedisService, analysis_key, content_etag, listing_match_key
 from .ai_service import AIService
+from .token_manager import TokenManager
+from .reference_data import ReferenceData
+from .vacancy_ranking import TopN, currency_rates, normalize_salary
+from ..core.metrics import SEMAPHORE_WAIT, run_background_task
+from ..core.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# HH tokens already looked up during the current request, keyed by user id
+_request_tokens: ContextVar[Optional[Dict[str, str]]] = ContextVar("request_tokens", default=None)
+
+@contextmanager
+def request_token_scope():
+    """Share HH token lookups between all service calls of one request"""
+    reset_token = _request_tokens.set({})
+    try:
+        yield
+    finally:
+        _request_tokens.reset(reset_token)
+
+def normalize_skill(skill: str) -> str:
+    """Index form of a skill name: "Python 3 " and "python  3" are the same skill"""
+    return " ".join(skill.lower().replace("ё", "е").split())
+
+def key_skills(vacancy: Dict[str, Any]) -> List[str]:
+    """Skill names listed on a full HH vacancy"""
+    return [skill["name"] for skill in vacancy.get("key_skills") or [] if skill.get("name")]
+
+# Searches remembered for start-up warm-up. Each search adds a weight that
+# doubles every half-life, so older counts fade relative to recent ones
+# (weights stay within float range for well over a decade from the epoch).
+POPULAR_QUERIES_KEY = "popular_queries"
+POPULAR_QUERIES_KEEP = 500
+POPULAR_QUERIES_TTL = 2592000
+POPULAR_QUERIES_HALF_LIFE = 604800
+POPULAR_QUERIES_EPOCH = 1704067200
+# Concurrent letter generations per batch request
+LETTER_CONCURRENCY = 8
+# Result pages fetched ahead of the one being streamed by an export
+EXPORT_PAGE_CONCURRENCY = 3
+EXPORT_PER_PAGE = 100
+EXPORT_PAGE_ATTEMPTS = 3
+EXPORT_RETRY_DELAY = 1
+# Ranked searches keep this many best paid vacancies per query, shared by all users
+RANKED_POOL = 100
+RANKED_PER_PAGE = 100
+RANKED_CACHE_TTL = 600
+RANKED_PAGE_CONCURRENCY = 5
+# One request per query builds the ranking; the others poll the cache meanwhile
+RANKED_LOCK_TTL = 30
+RANKED_WAIT_STEP = 0.2
+# Share of the match score in the combined ranking
+MATCH_WEIGHT = 0.5
+# Index candidates read per recommended vacancy, to make up for expired ones
+RECOMMEND_OVERFETCH = 3
+
+class ExportIncomplete(Exception):
+    """An export page could not be loaded; results after it are missing"""
+
+    def __init__(self, page: int, detail: str):
+        super().__init__(f"Page {page} failed: {detail}")
+        self.page = page
+        self.detail = detail
+
+def _status(error: Exception) -> Optional[int]:
+    """HTTP status of a failed HH call, None when it never got a response"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    if isinstance(error, HTTPException):
+        return error.status_code
+    return None
+
+def _transient(error: Exception) -> bool:
+    """Whether retrying a failed HH call may help: 5xx, 429 and transport errors"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    status = _status(error)
+    return status is not None and (status >= 500 or status == 429)
 
 class HHService:
-    def __init__(self):
-        self.hh_client = HHClient()
-        self.redis_service = RedisService()
-        self.ai_service = AIService()
+    def __init__(
+        self,
+        redis_service: RedisService = None,
+        hh_client: HHClient = None,
+        ai_service: AIService = None,
+        token_manager: TokenManager = None,
+        reference_data: ReferenceData = None
+    ):
+        self.hh_client = hh_client or HHClient()
+        self.redis_service = redis_service or RedisService()
+        self.ai_service = ai_service or AIService()
+        self.token_manager = token_manager or TokenManager(self.redis_service, self.hh_client)
+        self.reference_data = reference_data or ReferenceData(self.redis_service, self.hh_client)
 
+    @traced("HHService.get_user_resume")
     async def get_user_resume(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user's resume with caching"""
         cached = await self.redis_service.get_json(f"resume:{user_id}")
         if cached:
             return cached
         
-        token = await self.redis_service.get_user_token(user_id)
-        if not token:
-            raise HTTPException(401, "Token expired")
+        token = await self._get_token(user_id)
         
         resume = await self.hh_client.get_resume(token)
         if resume:
             await self.redis_service.set_json(f"resume:{user_id}", resume, 3600)
         return resume
 
+    @traced("HHService.search_vacancies")
     async def search_vacancies(self, user_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Search vacancies with filters"""
-        token = await self.redis_service.get_user_token(user_id)
-        if not token:
-            raise HTTPException(401, "Token expired")
+        token = await self._get_token(user_id)
         
         result = await self.hh_client.search_vacancies(token, params)
         
@@ -48,12 +140,14 @@ class HHService:
         
         return result
 
+    @traced("HHService.search_vacancies_with_details")
     async def search_vacancies_with_details(self, user_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Search vacancies and load details for each with parallel loading"""
-        token = await self.redis_service.get_user_token(user_id)
-        if not token:
-            raise HTTPException(401, "Token expired")
-        
+        token = await self._get_token(user_id)
+        return await self._search_with_details(token, params)
+
+    async def _search_with_details(self, token: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
+        """Search vacancies and load details, anonymously when token is None"""
         # Get initial list
         result = await self.hh_client.search_vacancies(token, params)
         
@@ -63,7 +157,9 @@ class HHService:
             semaphore = asyncio.Semaphore(5)
             
             async def load_vacancy_details(vacancy: Dict[str, Any]) -> Dict[str, Any]:
+                wait_start = time.perf_counter()
                 async with semaphore:
+                    SEMAPHORE_WAIT.labels("vacancy_details").observe(time.perf_counter() - wait_start)
                     try:
                         # Check cache first (10 min cache)
                         cache_key = f"vacancy:detail:{vacancy['id']}"
@@ -87,15 +183,17 @@ class HHService:
                             "employment": full_vacancy.get("employment"),
                             "description": self._clean_description(full_vacancy.get("description", "")),
                             "snippet": full_vacancy.get("snippet"),
-                            "experience": full_vacancy.get("experience")
+                            "experience": full_vacancy.get("experience"),
+                            "key_skills": key_skills(full_vacancy)
                         }
                         
                         # Cache for 10 minutes
                         await self.redis_service.set_json(cache_key, detail, 600)
+                        await self._index_skills(detail, 600)
                         return detail
                         
                     except Exception as e:
-                        print(f"Error loading vacancy {vacancy['id']}: {e}")
+                        logger.warning("Error loading vacancy %s: %s", vacancy['id'], e)
                         # Return basic info on error
                         return {
                             "id": vacancy["id"],
@@ -114,6 +212,7 @@ class HHService:
         
         return result
 
+    @traced("HHService.get_vacancy_details")
     async def get_vacancy_details(self, user_id: str, vacancy_id: str) -> Dict[str, Any]:
         """Get full vacancy details with caching"""
         cache_key = f"vacancy:full:{vacancy_id}"
@@ -121,9 +220,7 @@ class HHService:
         if cached:
             return cached
         
-        token = await self.redis_service.get_user_token(user_id)
-        if not token:
-            raise HTTPException(401, "Token expired")
+        token = await self._get_token(user_id)
         
         vacancy = await self.hh_client.get_vacancy(token, vacancy_id)
         
@@ -143,48 +240,50 @@ class HHService:
             "salary": vacancy.get("salary"),
             "employer": vacancy.get("employer", {"name": "Не указано"}),
             "area": vacancy.get("area", {"name": "Не указано"}),
-            "snippet": vacancy.get("snippet")
+            "snippet": vacancy.get("snippet"),
+            "key_skills": key_skills(vacancy)
         }
         
-        await self.redis_service.set_json(cache_key, result, 86400)
+        await self.redis_service.set_json(cache_key, result, 86400, etag=True)
+        await self._index_skills(result, 86400)
         return result
 
+    @traced("HHService.get_vacancy_details_json")
+    async def get_vacancy_details_json(self, user_id: str, vacancy_id: str) -> Tuple[str, str]:
+        """Get full vacancy details as ready-to-send JSON, with its ETag"""
+        data, etag = await self.redis_service.get_json_raw(f"vacancy:full:{vacancy_id}")
+        if data is None:
+            data = json.dumps(await self.get_vacancy_details(user_id, vacancy_id), ensure_ascii=False)
+        # Entries cached before ETags were stored get one on the fly
+        return data, etag or content_etag(data)
+
+    @traced("HHService.get_dictionaries")
     async def get_dictionaries(self) -> Dict[str, Any]:
-        """Get HH dictionaries with caching"""
-        cached = await self.redis_service.get_json("dictionaries")
-        if cached:
-            return cached
-        
-        data = await self.hh_client.get_dictionaries()
-        result = {
-            "experience": data.get("experience", []),
-            "employment": data.get("employment", []),
-            "schedule": data.get("schedule", [])
-        }
-        
-        await self.redis_service.set_json("dictionaries", result, 604800)
-        return result
+        """Get HH dictionaries from the shared reference snapshot"""
+        snapshot = await self.reference_data.get_snapshot()
+        return snapshot.dictionaries
 
-    async def get_areas(self) -> Dict[str, Any]:
-        """Get areas with caching"""
-        cached = await self.redis_service.get_json("areas")
-        if cached:
-            return cached
-        
-        data = await self.hh_client.get_areas()
-        await self.redis_service.set_json("areas", data, 604800)
-        return data
+    @traced("HHService.get_dictionaries_json")
+    async def get_dictionaries_json(self) -> Tuple[memoryview, str]:
+        """Get HH dictionaries as ready-to-send JSON, with its ETag"""
+        snapshot = await self.reference_data.get_snapshot()
+        return snapshot.dictionaries_json, f'"{snapshot.version}-dictionaries"'
 
+    @traced("HHService.get_areas_json")
+    async def get_areas_json(self) -> Tuple[memoryview, str]:
+        """Get areas as ready-to-send JSON, without parsing the tree, with its ETag"""
+        snapshot = await self.reference_data.get_snapshot()
+        return snapshot.areas_json, f'"{snapshot.version}-areas"'
+
+    @traced("HHService.analyze_vacancy_match")
     async def analyze_vacancy_match(self, user_id: str, vacancy_id: str) -> Dict[str, Any]:
         """Analyze match between resume and vacancy"""
-        cache_key = f"analysis:{user_id}:{vacancy_id}"
+        cache_key = analysis_key(user_id, vacancy_id)
         cached = await self.redis_service.get_json(cache_key)
         if cached:
             return cached
         
-        token = await self.redis_service.get_user_token(user_id)
-        if not token:
-            raise HTTPException(401, "Token expired")
+        token = await self._get_token(user_id)
         
         resume = await self.get_user_resume(user_id)
         vacancy = await self.hh_client.get_vacancy(token, vacancy_id)
@@ -193,24 +292,329 @@ class HHService:
         await self.redis_service.set_json(cache_key, score, 86400)
         return score
 
+    @traced("HHService.generate_cover_letter")
     async def generate_cover_letter(self, user_id: str, vacancy_id: str) -> Dict[str, Any]:
         """Generate cover letter for vacancy"""
-        token = await self.redis_service.get_user_token(user_id)
-        if not token:
-            raise HTTPException(401, "Token expired")
-        
         resume = await self.get_user_resume(user_id)
-        vacancy = await self.hh_client.get_vacancy(token, vacancy_id)
+        vacancy = await self.get_vacancy_details(user_id, vacancy_id)
         
         return await self.ai_service.generate_cover_letter(resume, vacancy)
 
+    @traced("HHService.generate_cover_letters")
+    async def generate_cover_letters(self, user_id: str, vacancy_ids: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Generate cover letters for several vacancies, yielding each as it is ready.
+
+        Resume and auth problems are raised here, before anything is streamed;
+        per-vacancy failures are reported in the stream.
+        """
+        vacancy_ids = list(dict.fromkeys(vacancy_ids))
+        resume = await self.get_user_resume(user_id)
+        if not resume:
+            raise HTTPException(400, "No resume found")
+        profile = self.ai_service.prepare_resume(resume)
+        
+        # Either cached shape carries the name and employer a letter needs
+        keys = [f"vacancy:full:{vid}" for vid in vacancy_ids] + [f"vacancy:detail:{vid}" for vid in vacancy_ids]
+        cached = await self.redis_service.get_many_json(keys)
+        vacancies = {
+            vid: cached[f"vacancy:full:{vid}"] or cached[f"vacancy:detail:{vid}"]
+            for vid in vacancy_ids
+        }
+        semaphore = asyncio.Semaphore(LETTER_CONCURRENCY)
+        
+        async def generate(vacancy_id: str) -> Dict[str, Any]:
+            wait_start = time.perf_counter()
+            async with semaphore:
+                SEMAPHORE_WAIT.labels("cover_letters").observe(time.perf_counter() - wait_start)
+                try:
+                    vacancy = vacancies[vacancy_id] or await self.get_vacancy_details(user_id, vacancy_id)
+                    letter = await self.ai_service.generate_cover_letter(resume, vacancy, profile)
+                    return {"vacancy_id": vacancy_id, **letter}
+                except Exception as e:
+                    logger.warning("Cover letter for vacancy %s failed: %s", vacancy_id, e)
+                    detail = e.detail if isinstance(e, HTTPException) else "Generation failed"
+                    return {"vacancy_id": vacancy_id, "error": detail}
+        
+        async def stream() -> AsyncIterator[Dict[str, Any]]:
+            tasks = [asyncio.create_task(generate(vid)) for vid in vacancy_ids]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                # Client went away mid-batch
+                for task in tasks:
+                    task.cancel()
+        
+        return stream()
+
+    @traced("HHService.export_vacancies")
+    async def export_vacancies(self, user_id: str, params: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every detailed vacancy of a search, page by page in order.
+
+        The first page is loaded here, so auth and HH errors are raised
+        before anything is streamed. Later pages are fetched a few at a time
+        ahead of the consumer, so memory stays bounded by that window.
+        Transient HH failures (5xx, 429, transport) are retried; a page that
+        fails otherwise, or keeps failing, ends the stream with ExportIncomplete.
+        """
+        token = await self._get_token(user_id)
+        params = {**params, "per_page": EXPORT_PER_PAGE}
+        first = await self._search_with_details(token, {**params, "page": 0})
+        pages = first.get("pages") or 0
+        
+        async def load_page(page: int) -> List[Dict[str, Any]]:
+            page_token = token
+            for attempt in range(EXPORT_PAGE_ATTEMPTS):
+                try:
+                    result = await self._search_with_details(page_token, {**params, "page": page})
+                    return result.get("items") or []
+                except Exception as e:
+                    logger.warning("Export of page %d failed (attempt %d): %s", page, attempt + 1, e)
+                    # A long export may outlive the token; a 401 is retried once it was refreshed
+                    fresh_token = await self.redis_service.get_user_token(user_id) or page_token
+                    expired = _status(e) == 401 and fresh_token != page_token
+                    if attempt + 1 == EXPORT_PAGE_ATTEMPTS or not (_transient(e) or expired):
+                        detail = e.detail if isinstance(e, HTTPException) else str(e) or type(e).__name__
+                        raise ExportIncomplete(page, detail) from e
+                    page_token = fresh_token
+                    if not expired:
+                        await asyncio.sleep(EXPORT_RETRY_DELAY * 2 ** attempt)
+        
+        async def stream() -> AsyncIterator[Dict[str, Any]]:
+            pending = deque()
+            next_page = 1
+            try:
+                for item in first.get("items") or []:
+                    yield item
+                while next_page < pages or pending:
+                    while next_page < pages and len(pending) < EXPORT_PAGE_CONCURRENCY:
+                        pending.append(asyncio.create_task(load_page(next_page)))
+                        next_page += 1
+                    for item in await pending.popleft():
+                        yield item
+            finally:
+                # Client went away mid-export
+                for task in pending:
+                    task.cancel()
+        
+        return stream()
+
+    @traced("HHService.search_ranked")
+    async def search_ranked(self, user_id: str, filters: Dict[str, Any], pages: int,
+                            top: int, with_match: bool = False) -> Dict[str, Any]:
+        """Search several pages at once, ranked by normalized salary and optionally match score.
+
+        The salary ranking is cached under the canonical query and shared by
+        all users; only folding in the match score, which depends on the
+        user's resume, is done per request.
+        """
+        ranked = await self._ranked_pool(user_id, filters, pages)
+        items = ranked["items"]
+        if with_match:
+            items = await self._rank_by_match(user_id, items, top)
+        return {"found": ranked["found"], "pages": pages, "items": items[:top]}
+
+    async def _ranked_pool(self, user_id: str, filters: Dict[str, Any], pages: int) -> Dict[str, Any]:
+        """Best paid vacancies across the first pages of a search"""
+        query = json.dumps({**filters, "pages": pages}, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha1(query.encode()).hexdigest()
+        cache_key = f"vacancy:ranked:{digest}"
+        cached = await self.redis_service.get_json(cache_key)
+        if cached:
+            return cached
+        
+        owner = await self.redis_service.acquire_lock(f"ranked:{digest}", RANKED_LOCK_TTL)
+        if not owner:
+            # Someone else is ranking this query, wait for their result
+            deadline = time.monotonic() + RANKED_LOCK_TTL
+            while time.monotonic() < deadline:
+                await asyncio.sleep(RANKED_WAIT_STEP)
+                cached = await self.redis_service.get_json(cache_key)
+                if cached:
+                    return cached
+                if not await self.redis_service.lock_held(f"ranked:{digest}"):
+                    break
+            # Their ranking failed or came out partial (never cached); rank ourselves
+            return await self._build_ranked_pool(user_id, filters, pages, cache_key)
+        try:
+            return await self._build_ranked_pool(user_id, filters, pages, cache_key)
+        finally:
+            await self.redis_service.release_lock(f"ranked:{digest}", owner)
+
+    async def _build_ranked_pool(self, user_id: str, filters: Dict[str, Any], pages: int,
+                                 cache_key: str) -> Dict[str, Any]:
+        """Fetch the pages of a search from HH and rank them by salary"""
+        token = await self._get_token(user_id)
+        rates = currency_rates(await self.get_dictionaries())
+        
+        semaphore = asyncio.Semaphore(RANKED_PAGE_CONCURRENCY)
+        
+        async def fetch(page: int) -> Dict[str, Any]:
+            wait_start = time.perf_counter()
+            async with semaphore:
+                SEMAPHORE_WAIT.labels("ranked_pages").observe(time.perf_counter() - wait_start)
+                return await self.hh_client.search_vacancies(
+                    token, {**filters, "page": page, "per_page": RANKED_PER_PAGE}
+                )
+        
+        pool = TopN(RANKED_POOL)
+        seen = set()
+        found = 0
+        errors = []
+        # Pages are folded in as they arrive, so only the pool is kept in memory
+        for next_done in asyncio.as_completed([fetch(page) for page in range(pages)]):
+            try:
+                result = await next_done
+            except Exception as e:
+                logger.warning("Ranked search page failed: %s", e)
+                errors.append(e)
+                continue
+            found = max(found, result.get("found") or 0)
+            for vacancy in result.get("items") or []:
+                # Results can shift between pages while we read them
+                if vacancy["id"] in seen:
+                    continue
+                seen.add(vacancy["id"])
+                salary = normalize_salary(vacancy.get("salary"), rates)
+                pool.push(salary if salary is not None else -1, {**vacancy, "salary_normalized": salary})
+        if len(errors) == pages:
+            raise errors[0]
+        
+        ranked = {"found": found, "items": pool.items()}
+        # A partial ranking is served but not shared
+        if not errors:
+            await self.redis_service.set_json(cache_key, ranked, RANKED_CACHE_TTL)
+        return ranked
+
+    async def _rank_by_match(self, user_id: str, items: List[Dict[str, Any]], top: int) -> List[Dict[str, Any]]:
+        """Re-rank a salary ranked pool by salary and the user's match score"""
+        resume = await self.get_user_resume(user_id)
+        if not resume:
+            raise HTTPException(400, "No resume found")
+        ids = [vacancy["id"] for vacancy in items]
+        cached = await self.redis_service.get_many_json(
+            [analysis_key(user_id, vid) for vid in ids] + [listing_match_key(user_id, vid) for vid in ids]
+        )
+        semaphore = asyncio.Semaphore(LETTER_CONCURRENCY)
+        
+        async def match_score(vacancy: Dict[str, Any]) -> int:
+            # A full analysis is preferred over a score from an earlier ranking
+            known = cached[analysis_key(user_id, vacancy["id"])] or cached[listing_match_key(user_id, vacancy["id"])]
+            if known:
+                return known["score"]
+            wait_start = time.perf_counter()
+            async with semaphore:
+                SEMAPHORE_WAIT.labels("match_scores").observe(time.perf_counter() - wait_start)
+                analysis = await self.ai_service.analyze_match(resume, vacancy)
+            # Scored from the search listing, so kept apart from the full analysis
+            await self.redis_service.set_json(
+                listing_match_key(user_id, vacancy["id"]), {"score": analysis["score"]}, 86400
+            )
+            return analysis["score"]
+        
+        scores = await asyncio.gather(*(match_score(vacancy) for vacancy in items))
+        best_salary = max((v["salary_normalized"] or 0 for v in items), default=0) or 1
+        ranked = TopN(top)
+        for vacancy, score in zip(items, scores):
+            salary_score = 100 * max(vacancy["salary_normalized"] or 0, 0) / best_salary
+            combined = (1 - MATCH_WEIGHT) * salary_score + MATCH_WEIGHT * score
+            ranked.push(combined, {**vacancy, "match_score": score})
+        return ranked.items()
+
+    async def _index_skills(self, vacancy: Dict[str, Any], ttl: int):
+        """Add a vacancy just cached for ttl seconds to the skill index"""
+        skills = {normalize_skill(skill) for skill in vacancy["key_skills"]}
+        await self.redis_service.index_skills(vacancy["id"], sorted(skills - {""}), time.time() + ttl)
+
+    @traced("HHService.get_recommended_vacancies")
+    async def get_recommended_vacancies(self, user_id: str, limit: int) -> Dict[str, Any]:
+        """Cached vacancies sharing the most skills with the user's resume.
+
+        Served from the skill index and the vacancy caches only. Index
+        entries expire with the cache entries they point to; vacancies
+        evicted early are skipped and dropped from the index.
+        """
+        resume = await self.get_user_resume(user_id)
+        if not resume:
+            raise HTTPException(400, "No resume found")
+        skills = sorted({normalize_skill(skill) for skill in resume.get("skill_set") or []} - {""})
+        if not skills:
+            return {"skills": [], "items": []}
+        
+        matches = await self.redis_service.match_skills(skills, limit * RECOMMEND_OVERFETCH)
+        ids = [vacancy_id for vacancy_id, _ in matches]
+        keys = [f"vacancy:full:{vid}" for vid in ids] + [f"vacancy:detail:{vid}" for vid in ids]
+        cached = await self.redis_service.get_many_json(keys)
+        
+        wanted = set(skills)
+        items = []
+        expired = []
+        for vacancy_id, score in matches:
+            vacancy = cached[f"vacancy:full:{vacancy_id}"] or cached[f"vacancy:detail:{vacancy_id}"]
+            if not vacancy:
+                expired.append(vacancy_id)
+                continue
+            if len(items) < limit:
+                matched = [s for s in vacancy.get("key_skills") or [] if normalize_skill(s) in wanted]
+                items.append({**vacancy, "matched_skills": matched, "match_count": int(score)})
+        if expired:
+            await self.redis_service.unindex_skills(expired, skills)
+        return {"skills": skills, "items": items}
+
+    @traced("HHService.apply_to_vacancy")
     async def apply_to_vacancy(self, user_id: str, vacancy_id: str, message: str) -> Dict[str, Any]:
         """Apply to vacancy"""
+        token = await self._get_token(user_id)
+        
+        return await self.hh_client.apply_to_vacancy(token, vacancy_id, message)
+
+    @traced("HHService.record_search")
+    async def record_search(self, params: Dict[str, Any]) -> None:
+        """Count a first-page search so popular ones can be warmed on start-up"""
+        query = {k: v for k, v in params.items() if k not in ("page", "per_page")}
+        weight = 2 ** ((time.time() - POPULAR_QUERIES_EPOCH) / POPULAR_QUERIES_HALF_LIFE)
+        await self.redis_service.increment_score(
+            POPULAR_QUERIES_KEY,
+            json.dumps(query, sort_keys=True, ensure_ascii=False),
+            weight,
+            keep=POPULAR_QUERIES_KEEP,
+            expire=POPULAR_QUERIES_TTL
+        )
+
+    @traced("HHService.warm_popular_queries")
+    async def warm_popular_queries(self, limit: int, per_page: int = 20) -> int:
+        """Pre-load details for the first page of the most popular searches"""
+        queries = await self.redis_service.get_top_members(POPULAR_QUERIES_KEY, limit)
+        warmed = 0
+        for query in queries:
+            params = json.loads(query)
+            params.update({"page": 0, "per_page": per_page})
+            try:
+                # Vacancy search is a public HH endpoint, no user token needed
+                await self._search_with_details(None, params)
+                warmed += 1
+            except Exception as e:
+                logger.warning("Warm-up of query %s failed: %s", query, e)
+        return warmed
+
+    async def _get_token(self, user_id: str) -> str:
+        """Get user's HH token, once per request"""
+        tokens = _request_tokens.get()
+        if tokens is not None and user_id in tokens:
+            return tokens[user_id]
+        
         token = await self.redis_service.get_user_token(user_id)
         if not token:
-            raise HTTPException(401, "Token expired")
+            # Background refresh missed this one, refresh inline if we still can
+            token = await self.token_manager.refresh_user_token(user_id, force=True)
+            if not token:
+                token = await self.redis_service.get_user_token(user_id)
+            if not token:
+                raise HTTPException(401, "Token expired")
         
-        return await self.hh_client.apply_to_vacancy(token, vacancy_id, message)
+        if tokens is not None:
+            tokens[user_id] = token
+        return token
 
     def _clean_description(self, html_text: str) -> str:
         """Clean HTML from description"""
@@ -220,6 +624,7 @@ class HHService:
         # Limit to 500 chars
         return clean_text[:500] + "..." if len(clean_text) > 500 else clean_text
     
+    @traced("HHService.warm_cache_next_page")
     async def warm_cache_next_page(self, user_id: str, params: Dict[str, Any]) -> None:
         """Pre-load next page of results in background"""
         try:
@@ -228,6 +633,9 @@ class HHService:
             next_params["page"] = params.get("page", 0) + 1
             
             # Run in background without waiting
-            asyncio.create_task(self.search_vacancies_with_details(user_id, next_params))
+            asyncio.create_task(run_background_task(
+                "warm_next_page",
+                self.search_vacancies_with_details(user_id, next_params)
+            ))
         except Exception as e:
-            print(f"Cache warming failed: {e}")
\ No newline at end of file
+            logger.warning("Cache warming failed: %s", e)
\ No newline at end of file
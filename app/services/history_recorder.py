@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime
+from typing import Any, Dict, List
+from sqlalchemy.dialects.postgresql import insert
+from .redis_service import RedisService, analysis_key
+from .history_stats import apply_increments
+from ..core.database import SessionLocal
+from ..core.metrics import run_background_task
+from ..core.tracing import traced
+from ..models.db_models import ResponseHistory
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_STREAM = "history:outbox"
+CONSUMER_GROUP = "history-writer"
+BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "500"))
+BLOCK_MS = 1000
+# Events a consumer has held this long without acking are taken over
+CLAIM_IDLE_MS = 60000
+RETRY_DELAY = 5
+
+class HistoryRecorder:
+    """Write-behind recorder for application history.
+
+    The apply path only appends an event to a Redis Stream on the primary.
+    A consumer group drains the stream: events are enriched from the cache
+    (match score, vacancy title, employer, area), inserted in batches, and acknowledged only
+    after the commit. Delivery is at-least-once; the unique
+    (user_id, vacancy_id) index makes redelivered events no-ops.
+    """
+
+    def __init__(self, redis_service: RedisService = None, session_factory=SessionLocal):
+        self.redis_service = redis_service or RedisService()
+        self.session_factory = session_factory
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+    @traced("HistoryRecorder.record")
+    async def record(self, user_id: str, vacancy_id: str, vacancy_title: str, cover_letter: str):
+        """Queue an application for the history table"""
+        await self.redis_service.stream_append(OUTBOX_STREAM, {
+            "user_id": user_id,
+            "vacancy_id": vacancy_id,
+            "vacancy_title": vacancy_title or "",
+            "cover_letter": cover_letter,
+            "created_at": datetime.utcnow().isoformat()
+        })
+
+    async def _enrich(self, events: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """Build history rows, filling score, title, employer and area from the cache"""
+        analysis_keys = [analysis_key(e["user_id"], e["vacancy_id"]) for e in events]
+        full_keys = [f"vacancy:full:{e['vacancy_id']}" for e in events]
+        # Applications from the listing only have the detail entry cached
+        detail_keys = [f"vacancy:detail:{e['vacancy_id']}" for e in events]
+        cached = await self.redis_service.get_many_json(
+            list(dict.fromkeys(analysis_keys + full_keys + detail_keys))
+        )
+
+        rows = {}
+        for event, key, full_key, detail_key in zip(events, analysis_keys, full_keys, detail_keys):
+            analysis = cached.get(key) or {}
+            vacancy = cached.get(full_key) or cached.get(detail_key) or {}
+            title = event["vacancy_title"] or vacancy.get("name") or "Unknown"
+            # Duplicates within a batch would conflict with each other
+            rows[(event["user_id"], event["vacancy_id"])] = {
+                "user_id": event["user_id"],
+                "vacancy_id": event["vacancy_id"],
+                "vacancy_title": title,
+                "cover_letter": event["cover_letter"],
+                "match_score": analysis.get("score"),
+                "employer_name": (vacancy.get("employer") or {}).get("name"),
+                "area_name": (vacancy.get("area") or {}).get("name"),
+                "created_at": datetime.fromisoformat(event["created_at"])
+            }
+        return list(rows.values())
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> int:
+        """Multi-row insert skipping already recorded applications, return inserted count.
+
+        Rollups are updated in the same transaction, only for rows actually
+        inserted, so redelivered events are never counted twice.
+        """
+        statement = insert(ResponseHistory).values(rows).on_conflict_do_nothing(
+            index_elements=["user_id", "vacancy_id"]
+        ).returning(ResponseHistory.user_id, ResponseHistory.vacancy_id)
+        db = self.session_factory()
+        try:
+            inserted = {tuple(row) for row in db.execute(statement).fetchall()}
+            apply_increments(db, [r for r in rows if (r["user_id"], r["vacancy_id"]) in inserted])
+            db.commit()
+            return len(inserted)
+        finally:
+            db.close()
+
+    @traced("HistoryRecorder.flush")
+    async def flush(self, entries: List[tuple]) -> int:
+        """Persist a batch of stream entries and acknowledge them"""
+        if not entries:
+            return 0
+        rows = await self._enrich([fields for _, fields in entries])
+        inserted = await asyncio.to_thread(self._insert, rows)
+        await self.redis_service.stream_ack(OUTBOX_STREAM, CONSUMER_GROUP, [entry_id for entry_id, _ in entries])
+        return inserted
+
+    async def run(self):
+        """Drain the outbox, runs until cancelled"""
+        group_ready = False
+        while True:
+            try:
+                if not group_ready:
+                    await self.redis_service.stream_ensure_group(OUTBOX_STREAM, CONSUMER_GROUP)
+                    group_ready = True
+                entries = await self.redis_service.stream_claim_stale(
+                    OUTBOX_STREAM, CONSUMER_GROUP, self.consumer, CLAIM_IDLE_MS, BATCH_SIZE
+                )
+                if not entries:
+                    entries = await self.redis_service.stream_read_group(
+                        OUTBOX_STREAM, CONSUMER_GROUP, self.consumer, BATCH_SIZE, BLOCK_MS
+                    )
+                if entries:
+                    await run_background_task("history_flush", self.flush(entries))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Unacked events stay pending and are reclaimed after CLAIM_IDLE_MS
+                logger.warning("History flush failed: %s", e)
+                await asyncio.sleep(RETRY_DELAY)
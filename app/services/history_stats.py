@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from ..models.db_models import ResponseHistory, ResponseStats
+
+RECENT_DAYS = 30
+RECENT_WEEKS = 12
+TOP_LIMIT = 10
+
+
+def _buckets(row: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Rollup buckets a history row counts towards"""
+    day = row["created_at"].date()
+    week = day - timedelta(days=day.weekday())
+    buckets = [("total", ""), ("day", day.isoformat()), ("week", week.isoformat())]
+    if row.get("employer_name"):
+        buckets.append(("employer", row["employer_name"]))
+    if row.get("area_name"):
+        buckets.append(("area", row["area_name"]))
+    return buckets
+
+
+def apply_increments(db: Session, rows: List[Dict[str, Any]]):
+    """Add newly inserted history rows to the rollups, in the caller's transaction"""
+    increments = defaultdict(lambda: [0, 0, 0])
+    for row in rows:
+        for bucket, key in _buckets(row):
+            counters = increments[(row["user_id"], bucket, key)]
+            counters[0] += 1
+            if row["match_score"] is not None:
+                counters[1] += 1
+                counters[2] += row["match_score"]
+    if not increments:
+        return
+
+    # Fixed row order keeps concurrent writers from deadlocking on each other
+    statement = insert(ResponseStats).values([
+        {
+            "user_id": user_id, "bucket": bucket, "key": key,
+            "count": count, "scored_count": scored_count, "score_sum": score_sum
+        }
+        for (user_id, bucket, key), (count, scored_count, score_sum) in sorted(increments.items())
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "bucket", "key"],
+        set_={
+            "count": ResponseStats.count + statement.excluded.count,
+            "scored_count": ResponseStats.scored_count + statement.excluded.scored_count,
+            "score_sum": ResponseStats.score_sum + statement.excluded.score_sum
+        }
+    )
+    db.execute(statement)
+
+
+def get_stats(db: Session, user_id: str) -> Dict[str, Any]:
+    """Read a user's statistics from the rollups; cost does not grow with history size"""
+    def rows(bucket: str, order_by, limit: int):
+        return db.query(ResponseStats).filter(
+            ResponseStats.user_id == user_id,
+            ResponseStats.bucket == bucket
+        ).order_by(order_by).limit(limit).all()
+
+    total = db.get(ResponseStats, (user_id, "total", ""))
+    scored = total.scored_count if total else 0
+    return {
+        "total": total.count if total else 0,
+        "average_match_score": round(total.score_sum / scored, 1) if scored else None,
+        "per_day": [
+            {"date": r.key, "count": r.count}
+            for r in reversed(rows("day", ResponseStats.key.desc(), RECENT_DAYS))
+        ],
+        "per_week": [
+            {"week": r.key, "count": r.count}
+            for r in reversed(rows("week", ResponseStats.key.desc(), RECENT_WEEKS))
+        ],
+        "top_employers": [
+            {"name": r.key, "count": r.count}
+            for r in rows("employer", ResponseStats.count.desc(), TOP_LIMIT)
+        ],
+        "top_areas": [
+            {"name": r.key, "count": r.count}
+            for r in rows("area", ResponseStats.count.desc(), TOP_LIMIT)
+        ]
+    }
+
+
+def backfill(db: Session) -> int:
+    """Rebuild all rollups from response_history, return the number of rollup rows"""
+    history = ResponseHistory
+    buckets = {
+        "total": literal(""),
+        "day": func.to_char(func.date_trunc("day", history.created_at), "YYYY-MM-DD"),
+        "week": func.to_char(func.date_trunc("week", history.created_at), "YYYY-MM-DD"),
+        "employer": history.employer_name,
+        "area": history.area_name,
+    }
+    # Writers block on the lock until we commit, then add their rows on top
+    db.execute(text("LOCK TABLE response_stats IN EXCLUSIVE MODE"))
+    db.query(ResponseStats).delete()
+    for bucket, key in buckets.items():
+        grouped = select(
+            history.user_id,
+            literal(bucket),
+            key,
+            func.count(),
+            func.count(history.match_score),
+            func.coalesce(func.sum(history.match_score), 0)
+        )
+        if bucket == "total":
+            grouped = grouped.group_by(history.user_id)
+        else:
+            grouped = grouped.where(key.isnot(None)).group_by(history.user_id, key)
+        db.execute(insert(ResponseStats).from_select(
+            ["user_id", "bucket", "key", "count", "scored_count", "score_sum"], grouped
+        ))
+    db.commit()
+    return db.query(ResponseStats).count()
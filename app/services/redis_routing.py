@@ -0,0 +1,100 @@
+import asyncio
+import bisect
+import hashlib
+import os
+from typing import Dict, List, Optional
+import redis.asyncio as redis
+from redis.asyncio.cluster import RedisCluster
+
+# Points per node on the hash ring; more points give a more even spread
+RING_REPLICAS = 160
+
+
+def hash_tag(key: str) -> str:
+    """Part of the key used for placement, following Redis Cluster hash tag rules"""
+    start = key.find("{")
+    if start != -1:
+        end = key.find("}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class CacheRouter:
+    """Routes cache keys to the Redis node that owns them.
+
+    Single-node by default; a Redis Cluster or a consistently hashed set of
+    standalone nodes when configured. Keys sharing a hash tag always land on
+    the same node (and slot), so batched reads over them stay single-node.
+    """
+
+    def __init__(self, clients: List[redis.Redis], cluster: Optional[RedisCluster] = None):
+        self.clients = clients
+        self.cluster = cluster
+        self._ring: List[int] = []
+        self._ring_nodes: List[redis.Redis] = []
+        if len(clients) > 1:
+            points = sorted(
+                (_ring_hash(f"{i}:{replica}"), i)
+                for i in range(len(clients))
+                for replica in range(RING_REPLICAS)
+            )
+            self._ring = [point for point, _ in points]
+            self._ring_nodes = [clients[i] for _, i in points]
+
+    @classmethod
+    def from_env(cls, primary: redis.Redis) -> "CacheRouter":
+        """Build from REDIS_CACHE_URLS / REDIS_CACHE_CLUSTER, sharing primary when unset"""
+        urls = [url.strip() for url in os.getenv("REDIS_CACHE_URLS", "").split(",") if url.strip()]
+        if not urls:
+            return cls([primary])
+        if os.getenv("REDIS_CACHE_CLUSTER", "").lower() in ("1", "true", "yes"):
+            cluster = RedisCluster.from_url(urls[0], decode_responses=True)
+            return cls([cluster], cluster=cluster)
+        return cls([redis.from_url(url, decode_responses=True) for url in urls])
+
+    def client_for(self, key: str):
+        """Client owning the key"""
+        if not self._ring:
+            return self.clients[0]
+        i = bisect.bisect(self._ring, _ring_hash(hash_tag(key))) % len(self._ring)
+        return self._ring_nodes[i]
+
+    def group(self, keys: List[str]) -> Dict[int, List[str]]:
+        """Split keys by owning client, keyed by client index in self.clients"""
+        if not self._ring:
+            return {0: list(keys)}
+        groups: Dict[int, List[str]] = {}
+        positions = {id(client): i for i, client in enumerate(self.clients)}
+        for key in keys:
+            groups.setdefault(positions[id(self.client_for(key))], []).append(key)
+        return groups
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """MGET across nodes, values in the order of keys"""
+        if not keys:
+            return []
+        if self.cluster is not None:
+            # Splits by slot internally; hash tagged keys share one request
+            return await self.cluster.mget_nonatomic(keys)
+        groups = self.group(keys)
+        if len(groups) == 1:
+            index, group_keys = next(iter(groups.items()))
+            return await self.clients[index].mget(group_keys)
+
+        results = await asyncio.gather(*(
+            self.clients[index].mget(group_keys) for index, group_keys in groups.items()
+        ))
+        values = {}
+        for group_keys, group_values in zip(groups.values(), results):
+            values.update(zip(group_keys, group_values))
+        return [values[key] for key in keys]
+
+    async def close(self, primary: redis.Redis):
+        for client in self.clients:
+            if client is not primary:
+                await client.aclose()
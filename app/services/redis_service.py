@@ -1,16 +1,102 @@
+import asyncio
+import hashlib
 import json
+import logging
+import math
+import secrets
+import time
 import redis.asyncio as redis
 import os
-from typing import Optional, Dict, Any, List
+import random
+import zlib
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple
 from fastapi import HTTPException
+from ..core.metrics import (
+    timed,
+    cache_namespace,
+    record_cache_lookup,
+    REDIS_OPERATION_LATENCY,
+    REDIS_ERRORS,
+)
+from ..core.tracing import traced
+from .redis_routing import CacheRouter, hash_tag
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of user ids scored by HH access token expiry (unix time)
+TOKEN_EXPIRY_KEY = "token_expiry"
+
+# Delete a lock only if it is still held by the caller
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Cache namespaces that may be evicted to stay within a memory budget.
+# Tokens live on the primary and are never part of this.
+EVICTABLE_NAMESPACES = ("vacancy:detail", "vacancy:full", "vacancy:ranked", "resume", "analysis")
+
+# Each namespace's index is split into shards, so index writes spread over
+# the cache nodes like the keys themselves
+CACHE_INDEX_SHARDS = int(os.getenv("CACHE_INDEX_SHARDS", "16"))
+
+def cache_index_key(namespace: str, key: str) -> str:
+    """Index shard holding a cache key: a sorted set of keys scored by expiry time"""
+    return f"cache:index:{{{namespace}:{zlib.crc32(key.encode()) % CACHE_INDEX_SHARDS}}}"
+
+def cache_index_shards(namespace: str) -> List[str]:
+    return [f"cache:index:{{{namespace}:{shard}}}" for shard in range(CACHE_INDEX_SHARDS)]
+
+# Inverted skill index: one sorted set of vacancy ids per normalized skill,
+# scored by when the vacancy's cache entry expires. Each set lands on its
+# own node; sets are pruned and capped on every write.
+SKILL_INDEX_TTL = 86400
+SKILL_INDEX_CAP = 1000
+
+def skill_key(skill: str) -> str:
+    return f"skill:{skill}"
+
+def etag_key(key: str) -> str:
+    """Key of a cached value's ETag, hash tagged onto the same node and slot as the value"""
+    return f"etag:{key}" if hash_tag(key) != key else f"etag:{{{key}}}"
+
+def content_etag(json_data: str) -> str:
+    """Strong ETag of a serialized value"""
+    return '"' + hashlib.blake2b(json_data.encode(), digest_size=16).hexdigest() + '"'
+
+def analysis_key(user_id: str, vacancy_id: str) -> str:
+    """Cache key of a match analysis; hash tagged so a user's analyses share a slot"""
+    return f"analysis:{{{user_id}}}:{vacancy_id}"
+
+def listing_match_key(user_id: str, vacancy_id: str) -> str:
+    """Cache key of a match score computed from a search listing rather than the full vacancy"""
+    return f"analysis:{{{user_id}}}:listing:{vacancy_id}"
 
 class RedisService:
-    def __init__(self):
+    """Redis access split by durability.
+
+    Tokens, locks and other small durable state live on the primary
+    (REDIS_URL). Disposable cache namespaces (get_json/set_json/
+    get_many_json) go through a CacheRouter, which may spread them over a
+    Redis Cluster or several nodes without call sites knowing.
+    """
+
+    def __init__(self, url: str = None):
         self.redis = redis.from_url(
-            os.getenv("REDIS_URL", "redis://localhost:6379"),
+            url or os.getenv("REDIS_URL", "redis://localhost:6379"),
             decode_responses=True
         )
+        self.cache = CacheRouter.from_env(self.redis)
 
+    async def close(self):
+        await self.cache.close(self.redis)
+        await self.redis.aclose()
+
+    @traced("RedisService.get_user_token")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="get_user_token")
     async def get_user_token(self, user_id: str) -> Optional[str]:
         """Get user's HH token"""
         token = await self.redis.get(f"token:{user_id}")
@@ -18,14 +104,23 @@ class RedisService:
             return None
         return token.decode() if isinstance(token, bytes) else token
 
+    @traced("RedisService.set_user_token")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="set_user_token")
     async def set_user_token(self, user_id: str, token: str, expires_in: int = 86400):
-        """Store user's HH token"""
-        await self.redis.setex(f"token:{user_id}", expires_in, token)
+        """Store user's HH token and track its expiry for background refresh"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.setex(f"token:{user_id}", expires_in, token)
+            pipe.zadd(TOKEN_EXPIRY_KEY, {user_id: time.time() + expires_in})
+            await pipe.execute()
 
+    @traced("RedisService.set_refresh_token")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="set_refresh_token")
     async def set_refresh_token(self, user_id: str, refresh_token: str):
         """Store user's refresh token (30 days)"""
         await self.redis.setex(f"refresh_token:{user_id}", 2592000, refresh_token)
     
+    @traced("RedisService.get_refresh_token")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="get_refresh_token")
     async def get_refresh_token(self, user_id: str) -> Optional[str]:
         """Get user's refresh token"""
         token = await self.redis.get(f"refresh_token:{user_id}")
@@ -33,34 +128,201 @@ class RedisService:
             return None
         return token.decode() if isinstance(token, bytes) else token
 
+    @traced("RedisService.get_tokens_expiring_before")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="get_tokens_expiring_before")
+    async def get_tokens_expiring_before(self, timestamp: float, limit: int = 100) -> List[str]:
+        """Get user ids whose HH token expires before timestamp, soonest first"""
+        return await self.redis.zrangebyscore(TOKEN_EXPIRY_KEY, "-inf", timestamp, start=0, num=limit)
+
+    @traced("RedisService.get_token_expiry")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="get_token_expiry")
+    async def get_token_expiry(self, user_id: str) -> Optional[float]:
+        """Get expiry time of user's HH token"""
+        return await self.redis.zscore(TOKEN_EXPIRY_KEY, user_id)
+
+    @traced("RedisService.get_next_token_expiry")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="get_next_token_expiry")
+    async def get_next_token_expiry(self) -> Optional[float]:
+        """Get the soonest tracked HH token expiry"""
+        soonest = await self.redis.zrange(TOKEN_EXPIRY_KEY, 0, 0, withscores=True)
+        return soonest[0][1] if soonest else None
+
+    @traced("RedisService.get_token_ttl")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="get_token_ttl")
+    async def get_token_ttl(self, user_id: str) -> Optional[float]:
+        """Seconds left before user's HH token expires, None when it is gone"""
+        ttl = await self.redis.pttl(f"token:{user_id}")
+        return ttl / 1000 if ttl > 0 else None
+
+    @traced("RedisService.track_token")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="track_token")
+    async def track_token(self, user_id: str, expires_at: float):
+        """Schedule the refresh of user's HH token at expires_at"""
+        await self.redis.zadd(TOKEN_EXPIRY_KEY, {user_id: expires_at})
+
+    @traced("RedisService.untrack_token")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="untrack_token")
+    async def untrack_token(self, user_id: str):
+        """Stop tracking user's HH token for refresh"""
+        await self.redis.zrem(TOKEN_EXPIRY_KEY, user_id)
+
+    async def ping(self, timeout: float = 1.0) -> bool:
+        """Whether the primary answers within timeout"""
+        try:
+            return await asyncio.wait_for(self.redis.ping(), timeout)
+        except Exception:
+            return False
+
+    @traced("RedisService.acquire_lock")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="acquire_lock")
+    async def acquire_lock(self, name: str, ttl: int) -> Optional[str]:
+        """Acquire a lock shared by all workers, return its owner token"""
+        owner = secrets.token_hex(8)
+        if await self.redis.set(f"lock:{name}", owner, nx=True, ex=ttl):
+            return owner
+        return None
+
+    @traced("RedisService.release_lock")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="release_lock")
+    async def release_lock(self, name: str, owner: str):
+        """Release a lock if it is still owned by owner"""
+        await self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{name}", owner)
+
+    @traced("RedisService.lock_held")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="lock_held")
+    async def lock_held(self, name: str) -> bool:
+        """Whether anyone holds a lock"""
+        return bool(await self.redis.exists(f"lock:{name}"))
+
+    @traced("RedisService.get_value")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="get_value")
+    async def get_value(self, key: str) -> Optional[str]:
+        """Get a plain string value"""
+        return await self.redis.get(key)
+
+    @traced("RedisService.set_value")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="set_value")
+    async def set_value(self, key: str, value: str, expire: int = None):
+        """Store a plain string value"""
+        await self.redis.set(key, value, ex=expire)
+
+    @traced("RedisService.increment_score")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="increment_score")
+    async def increment_score(self, key: str, member: str, amount: float = 1,
+                              keep: int = None, expire: int = None):
+        """Increment a member's score in a sorted set, optionally keeping only the top members"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zincrby(key, amount, member)
+            if keep:
+                pipe.zremrangebyrank(key, 0, -keep - 1)
+            if expire:
+                pipe.expire(key, expire)
+            await pipe.execute()
+
+    @traced("RedisService.get_top_members")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="get_top_members")
+    async def get_top_members(self, key: str, limit: int) -> List[str]:
+        """Get highest scored members of a sorted set"""
+        return await self.redis.zrevrange(key, 0, limit - 1)
+
+    @traced("RedisService.stream_append")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="stream_append")
+    async def stream_append(self, stream: str, fields: Dict[str, str]) -> str:
+        """Append an event to a stream on the primary, return its id"""
+        return await self.redis.xadd(stream, fields)
+
+    async def stream_ensure_group(self, stream: str, group: str):
+        """Create a consumer group (and the stream) if missing"""
+        try:
+            await self.redis.xgroup_create(stream, group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="stream_read_group")
+    async def stream_read_group(self, stream: str, group: str, consumer: str,
+                                count: int, block_ms: int) -> List[tuple]:
+        """Read new events for a consumer, as (id, fields) pairs"""
+        response = await self.redis.xreadgroup(group, consumer, {stream: ">"}, count=count, block=block_ms)
+        return response[0][1] if response else []
+
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="stream_claim_stale")
+    async def stream_claim_stale(self, stream: str, group: str, consumer: str,
+                                 min_idle_ms: int, count: int) -> List[tuple]:
+        """Take over events left unacknowledged by a dead consumer"""
+        response = await self.redis.xautoclaim(stream, group, consumer, min_idle_ms, "0-0", count=count)
+        return [entry for entry in response[1] if entry[1] is not None]
+
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="stream_ack")
+    async def stream_ack(self, stream: str, group: str, ids: List[str]):
+        """Acknowledge processed events and drop them from the stream"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, group, *ids)
+            pipe.xdel(stream, *ids)
+            await pipe.execute()
+
+    @traced("RedisService.get_json")
+    @timed(REDIS_OPERATION_LATENCY, operation="get_json")
     async def get_json(self, key: str) -> Optional[Dict[str, Any]]:
         """Get JSON data from Redis"""
         try:
-            data = await self.redis.get(key)
+            data = await self.cache.client_for(key).get(key)
+            record_cache_lookup(key, bool(data))
             if data:
                 return json.loads(data)
             return None
         except Exception as e:
-            print(f"Redis get error for {key}: {e}")
+            REDIS_ERRORS.labels("get_json").inc()
+            logger.warning("Redis get error for %s: %s", key, e)
             return None
 
-    async def set_json(self, key: str, data: Dict[str, Any], expire: int = None):
-        """Store JSON data in Redis"""
+    @traced("RedisService.get_json_raw")
+    @timed(REDIS_OPERATION_LATENCY, operation="get_json_raw")
+    async def get_json_raw(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """Get serialized JSON as stored, with its ETag if one was stored"""
+        try:
+            data, etag = await self.cache.mget([key, etag_key(key)])
+            record_cache_lookup(key, bool(data))
+            return data, etag
+        except Exception as e:
+            REDIS_ERRORS.labels("get_json_raw").inc()
+            logger.warning("Redis get error for %s: %s", key, e)
+            return None, None
+
+    @traced("RedisService.set_json")
+    @timed(REDIS_OPERATION_LATENCY, operation="set_json")
+    async def set_json(self, key: str, data: Dict[str, Any], expire: int = None, etag: bool = False):
+        """Store JSON data in Redis, optionally with an ETag next to it"""
         try:
             json_data = json.dumps(data, ensure_ascii=False)
-            if expire:
-                await self.redis.setex(key, expire, json_data)
-            else:
-                await self.redis.set(key, json_data)
+            client = self.cache.client_for(key)
+            namespace = cache_namespace(key)
+            index = cache_index_key(namespace, key)
+            index_client = self.cache.client_for(index)
+            indexed = expire and namespace in EVICTABLE_NAMESPACES
+            entry = {key: time.time() + expire} if indexed else None
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.set(key, json_data, ex=expire)
+                if etag:
+                    pipe.set(etag_key(key), content_etag(json_data), ex=expire)
+                if indexed and index_client is client:
+                    pipe.zadd(index, entry)
+                await pipe.execute()
+            if indexed and index_client is not client:
+                await index_client.zadd(index, entry)
         except Exception as e:
-            print(f"Redis set error for {key}: {e}")
+            REDIS_ERRORS.labels("set_json").inc()
+            logger.warning("Redis set error for %s: %s", key, e)
     
+    @traced("RedisService.get_many_json")
+    @timed(REDIS_OPERATION_LATENCY, operation="get_many_json")
     async def get_many_json(self, keys: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
         """Get multiple JSON values from Redis"""
         try:
-            values = await self.redis.mget(keys)
+            values = await self.cache.mget(keys)
             result = {}
             for key, value in zip(keys, values):
+                record_cache_lookup(key, bool(value))
                 if value:
                     try:
                         result[key] = json.loads(value)
@@ -70,5 +332,148 @@ class RedisService:
                     result[key] = None
             return result
         except Exception as e:
-            print(f"Redis mget error: {e}")
-            return {key: None for key in keys}
\ No newline at end of file
+            REDIS_ERRORS.labels("get_many_json").inc()
+            logger.warning("Redis mget error: %s", e)
+            return {key: None for key in keys}
+
+    async def _memory_usage(self, keys: List[str]) -> List[Optional[int]]:
+        """MEMORY USAGE of each key, None for missing keys"""
+        sizes = {}
+        for index, group_keys in self.cache.group(keys).items():
+            async with self.cache.clients[index].pipeline(transaction=False) as pipe:
+                for key in group_keys:
+                    pipe.memory_usage(key)
+                sizes.update(zip(group_keys, await pipe.execute()))
+        return [sizes[key] for key in keys]
+
+    @traced("RedisService.cache_usage")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="cache_usage")
+    async def cache_usage(self, namespace: str, sample_size: int) -> Dict[str, int]:
+        """Estimate key count and bytes of a cache namespace from a sample of its index"""
+        shards = cache_index_shards(namespace)
+        per_shard = math.ceil(sample_size / len(shards))
+        now = time.time()
+        
+        async def read_shard(index: str) -> tuple:
+            async with self.cache.client_for(index).pipeline(transaction=False) as pipe:
+                pipe.zremrangebyscore(index, "-inf", now)
+                pipe.zcard(index)
+                pipe.zrandmember(index, per_shard)
+                _, count, sample = await pipe.execute()
+            return count, sample or []
+        
+        results = await asyncio.gather(*(read_shard(index) for index in shards))
+        count = sum(shard_count for shard_count, _ in results)
+        sample = [key for _, shard_sample in results for key in shard_sample]
+        if not sample:
+            return {"keys": 0, "bytes": 0, "sampled": 0}
+
+        sizes = await self._memory_usage(sample)
+        # Keys Redis dropped on its own (maxmemory) are stale index entries
+        missing = [key for key, size in zip(sample, sizes) if size is None]
+        for key in missing:
+            index = cache_index_key(namespace, key)
+            await self.cache.client_for(index).zrem(index, key)
+        live = [size for size in sizes if size is not None]
+        keys = round(count * len(live) / len(sample))
+        average = sum(live) / len(live) if live else 0
+        return {"keys": keys, "bytes": int(keys * average), "sampled": len(sample)}
+
+    @traced("RedisService.evict_cache")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="evict_cache")
+    async def evict_cache(self, namespace: str, count: int) -> Tuple[int, int]:
+        """Delete up to count soonest-expiring entries of a namespace.
+
+        Returns how many index entries were popped and how many keys were
+        actually deleted; entries of keys Redis already dropped count only
+        towards the first.
+        """
+        if namespace not in EVICTABLE_NAMESPACES:
+            return 0, 0
+        shards = cache_index_shards(namespace)
+        # Keys hash evenly over shards, so each gives up its share; the
+        # remainder goes to shards picked at random so none is favoured
+        share, remainder = divmod(count, len(shards))
+        extra = set(random.sample(range(len(shards)), remainder))
+        quotas = [(index, share + (i in extra)) for i, index in enumerate(shards)]
+        popped = await asyncio.gather(*(
+            self.cache.client_for(index).zpopmin(index, quota) for index, quota in quotas if quota
+        ))
+        keys = [key for shard in popped for key, _ in shard if cache_namespace(key) == namespace]
+        deleted = 0
+        for position, group_keys in self.cache.group(keys).items():
+            async with self.cache.clients[position].pipeline(transaction=False) as pipe:
+                pipe.unlink(*group_keys)
+                pipe.unlink(*map(etag_key, group_keys))
+                removed, _ = await pipe.execute()
+            deleted += removed
+        return sum(len(shard) for shard in popped), deleted
+
+    async def _pipeline_by_node(self, keys: List[str], add_commands) -> List[Any]:
+        """Run add_commands(pipe, key) for every key, one pipeline per node, results in key order"""
+        async def run(position: int, group_keys: List[str]):
+            async with self.cache.clients[position].pipeline(transaction=False) as pipe:
+                for key in group_keys:
+                    add_commands(pipe, key)
+                return group_keys, await pipe.execute()
+        
+        groups = await asyncio.gather(*(
+            run(position, group_keys) for position, group_keys in self.cache.group(keys).items()
+        ))
+        results = {}
+        for group_keys, values in groups:
+            per_key = len(values) // len(group_keys)
+            for i, key in enumerate(group_keys):
+                results[key] = values[i * per_key:(i + 1) * per_key]
+        return [results[key] for key in keys]
+
+    @traced("RedisService.index_skills")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="index_skills")
+    async def index_skills(self, vacancy_id: str, skills: List[str], expires_at: float):
+        """Add a vacancy, cached until expires_at, to the index of each of its normalized skills"""
+        if not skills:
+            return
+        now = time.time()
+        
+        def add(pipe, key: str):
+            # GT: a shorter-lived cache entry never shortens a longer one
+            pipe.zadd(key, {vacancy_id: expires_at}, gt=True)
+            pipe.zremrangebyscore(key, "-inf", now)
+            # Over the cap, the entries expiring soonest go first
+            pipe.zremrangebyrank(key, 0, -SKILL_INDEX_CAP - 1)
+            pipe.expire(key, SKILL_INDEX_TTL)
+        
+        try:
+            await self._pipeline_by_node([skill_key(skill) for skill in skills], add)
+        except Exception as e:
+            logger.warning("Skill indexing of vacancy %s failed: %s", vacancy_id, e)
+
+    @traced("RedisService.unindex_skills")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="unindex_skills")
+    async def unindex_skills(self, vacancy_ids: List[str], skills: List[str]):
+        """Drop vacancies from the index of the given skills"""
+        try:
+            await self._pipeline_by_node(
+                [skill_key(skill) for skill in skills],
+                lambda pipe, key: pipe.zrem(key, *vacancy_ids)
+            )
+        except Exception as e:
+            logger.warning("Skill unindexing failed: %s", e)
+
+    @traced("RedisService.match_skills")
+    @timed(REDIS_OPERATION_LATENCY, REDIS_ERRORS, operation="match_skills")
+    async def match_skills(self, skills: List[str], limit: int) -> List[Tuple[str, int]]:
+        """Vacancy ids indexed under any of the skills with their matching skill count, best first"""
+        now = time.time()
+        try:
+            results = await self._pipeline_by_node(
+                [skill_key(skill) for skill in skills],
+                lambda pipe, key: pipe.zrangebyscore(key, now, "+inf")
+            )
+        except Exception as e:
+            logger.warning("Skill matching failed: %s", e)
+            return []
+        counts = Counter()
+        for (members,) in results:
+            counts.update(members)
+        return counts.most_common(limit)
@@ -0,0 +1,206 @@
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional
+from fastapi import HTTPException
+from .hh_client import HHClient
+from .redis_service import RedisService
+from ..core.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("REFERENCE_SNAPSHOT_DIR", "/tmp/hhback-reference")
+CHECK_INTERVAL = int(os.getenv("REFERENCE_CHECK_INTERVAL", "30"))
+REFERENCE_TTL = 604800
+LOCK_TTL = 120
+LOAD_ATTEMPTS = 50
+
+VERSION_KEY = "reference:version"
+AREAS_KEY = "areas"
+DICTIONARIES_KEY = "dictionaries"
+
+# Snapshot layout: header, then a table of (offset, length) for each section.
+# Sections: areas JSON, dictionaries JSON.
+MAGIC = b"HHREF\x00\x00\x02"
+# Part of the file name, so files in an older layout are rebuilt rather than mapped
+FORMAT = 2
+SECTIONS = 2
+HEADER = struct.Struct("<8sI" + "QQ" * SECTIONS)
+ALIGN = 8
+
+
+def _json_text(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_snapshot(areas_json: str, dictionaries_json: str) -> bytes:
+    """Compile reference data, as published compact JSON, into the flat binary snapshot format"""
+    sections = [areas_json.encode(), dictionaries_json.encode()]
+    table = []
+    body = bytearray()
+    position = HEADER.size
+    for section in sections:
+        padding = -position % ALIGN
+        body += b"\0" * padding
+        position += padding
+        table.extend((position, len(section)))
+        body += section
+        position += len(section)
+    return HEADER.pack(MAGIC, 1, *table) + bytes(body)
+
+
+class ReferenceSnapshot:
+    """Read-only view over a memory-mapped snapshot file.
+
+    Pages are shared between all processes mapping the same file, so
+    workers serve the areas tree without each holding a copy of it.
+    """
+
+    def __init__(self, path: str, version: str):
+        self.path = path
+        self.version = version
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, _, *table = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"Not a reference snapshot: {path}")
+        self.areas_json, self.dictionaries_json = [
+            view[table[i]:table[i] + table[i + 1]] for i in range(0, len(table), 2)
+        ]
+        self._dictionaries = None
+
+    @property
+    def dictionaries(self) -> Dict[str, Any]:
+        """Parsed dictionaries, small enough to keep per worker"""
+        if self._dictionaries is None:
+            self._dictionaries = json.loads(self.dictionaries_json.tobytes())
+        return self._dictionaries
+
+
+class ReferenceData:
+    """Keeps each worker mapped to the current reference snapshot.
+
+    The source data lives in Redis under a version key with the usual 7 day
+    TTL. When it expires, one worker (holding a Redis lock) refetches from HH
+    and publishes a new version. Every worker then compiles the snapshot
+    file for that version if it is missing on its host (writes are atomic
+    renames, so concurrent builders are harmless) and swaps its mapping.
+    """
+
+    def __init__(self, redis_service: RedisService = None, hh_client: HHClient = None,
+                 directory: str = SNAPSHOT_DIR):
+        self.redis_service = redis_service or RedisService()
+        self.hh_client = hh_client or HHClient()
+        self.directory = directory
+        self.snapshot: Optional[ReferenceSnapshot] = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def get_snapshot(self) -> ReferenceSnapshot:
+        """Current snapshot, loading it on first use"""
+        for _ in range(LOAD_ATTEMPTS):
+            if self.snapshot is not None:
+                return self.snapshot
+            await self.refresh()
+            if self.snapshot is None:
+                # Another worker is publishing, give it a moment
+                await asyncio.sleep(0.2)
+        raise HTTPException(503, "Reference data is not available")
+
+    @traced("ReferenceData.refresh")
+    async def refresh(self):
+        """Map the published version, publishing a new one if it expired"""
+        async with self._refresh_lock:
+            version = await self.redis_service.get_value(VERSION_KEY)
+            if not version:
+                version = await self._publish()
+            if version and (self.snapshot is None or self.snapshot.version != version):
+                if not await self._load(version):
+                    # The version outlived its source data; publish it again
+                    version = await self._publish()
+                    if version:
+                        await self._load(version)
+
+    async def _publish(self) -> Optional[str]:
+        """Fetch reference data from HH and publish it as a new version (leader only)"""
+        owner = await self.redis_service.acquire_lock("reference_rebuild", LOCK_TTL)
+        if not owner:
+            return None
+        try:
+            areas, raw_dictionaries = await asyncio.gather(
+                self.hh_client.get_areas(),
+                self.hh_client.get_dictionaries()
+            )
+            dictionaries = {
+                "experience": raw_dictionaries.get("experience", []),
+                "employment": raw_dictionaries.get("employment", []),
+                "schedule": raw_dictionaries.get("schedule", []),
+                "currency": raw_dictionaries.get("currency", [])
+            }
+            # Serializing the areas tree takes a while, keep it off the event loop
+            areas_json, dictionaries_json = await asyncio.to_thread(
+                lambda: (_json_text(areas), _json_text(dictionaries))
+            )
+            version = hashlib.sha1((areas_json + dictionaries_json).encode()).hexdigest()[:16]
+            # Source data sits next to the version on the primary, not on the
+            # disposable cache nodes, and outlives the version key so late
+            # readers can still compile it
+            await self.redis_service.set_value(AREAS_KEY, areas_json, REFERENCE_TTL + LOCK_TTL)
+            await self.redis_service.set_value(DICTIONARIES_KEY, dictionaries_json, REFERENCE_TTL + LOCK_TTL)
+            await self.redis_service.set_value(VERSION_KEY, version, REFERENCE_TTL)
+            return version
+        finally:
+            await self.redis_service.release_lock("reference_rebuild", owner)
+
+    async def _load(self, version: str) -> bool:
+        """Map the snapshot of a version, compiling it first if needed; False if its source is gone"""
+        path = os.path.join(self.directory, f"reference-{version}-v{FORMAT}.bin")
+        if not os.path.exists(path):
+            areas = await self.redis_service.get_value(AREAS_KEY)
+            dictionaries = await self.redis_service.get_value(DICTIONARIES_KEY)
+            if areas is None or dictionaries is None:
+                logger.warning("Reference data for version %s is missing in Redis", version)
+                return False
+            # Published JSON is already compact, it goes into the file unparsed
+            await asyncio.to_thread(self._write, path, areas, dictionaries)
+
+        # Swapping the reference is atomic; requests holding the old
+        # snapshot keep using it until they finish
+        self.snapshot = ReferenceSnapshot(path, version)
+        await asyncio.to_thread(self._remove_stale, path)
+        return True
+
+    def _write(self, path: str, areas_json: str, dictionaries_json: str):
+        data = build_snapshot(areas_json, dictionaries_json)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _remove_stale(self, current_path: str):
+        # Workers still mapping an unlinked file keep valid pages until they swap
+        for path in glob.glob(os.path.join(self.directory, "reference-*.bin")):
+            if path != current_path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    async def run(self):
+        """Check for new versions, runs until cancelled"""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Reference data refresh failed: %s", e)
+            await asyncio.sleep(CHECK_INTERVAL)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+from .hh_client import HHClient, TokenRefreshError
+from .redis_service import RedisService
+from ..core.metrics import run_background_task
+from ..core.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# HH only refreshes expired tokens, so refreshes are scheduled at expiry.
+# When HH's clock is behind and still calls a token live, retry this much later.
+EXPIRY_GRACE = int(os.getenv("TOKEN_EXPIRY_GRACE", "60"))
+REFRESH_INTERVAL = int(os.getenv("TOKEN_REFRESH_INTERVAL", "30"))
+REFRESH_BATCH_SIZE = int(os.getenv("TOKEN_REFRESH_BATCH_SIZE", "100"))
+REFRESH_CONCURRENCY = 5
+LOCK_TTL = 30
+
+class TokenManager:
+    """Refreshes HH access tokens as soon as they expire.
+
+    HH rejects refreshes of live tokens, so there is no refreshing ahead.
+    Expiry times are tracked in a Redis sorted set by RedisService.set_user_token
+    and the refresh loop wakes at the soonest one. Every worker may run the
+    loop; a per-user lock makes sure a token is refreshed once even when
+    several workers pick it up.
+    """
+
+    def __init__(self, redis_service: RedisService = None, hh_client: HHClient = None):
+        self.redis_service = redis_service or RedisService()
+        self.hh_client = hh_client or HHClient()
+
+    @traced("TokenManager.refresh_user_token")
+    async def refresh_user_token(self, user_id: str, force: bool = False) -> Optional[str]:
+        """Refresh user's HH token, return the new access token.
+
+        Returns None when the token was refreshed elsewhere meanwhile, is not
+        due yet, or was revoked; raises TokenRefreshError on transient errors.
+        """
+        owner = await self.redis_service.acquire_lock(f"token_refresh:{user_id}", LOCK_TTL)
+        if not owner:
+            return None
+        try:
+            # Another worker may have refreshed it while we were waiting
+            expires_at = await self.redis_service.get_token_expiry(user_id)
+            if not force and expires_at and expires_at > time.time():
+                return None
+
+            refresh_token = await self.redis_service.get_refresh_token(user_id)
+            if not refresh_token:
+                await self.redis_service.untrack_token(user_id)
+                return None
+
+            try:
+                token_data = await self.hh_client.refresh_access_token(refresh_token)
+            except TokenRefreshError as e:
+                if e.premature:
+                    # Not expired by HH's clock yet, come back at its real expiry
+                    ttl = await self.redis_service.get_token_ttl(user_id)
+                    await self.redis_service.track_token(user_id, time.time() + (ttl or EXPIRY_GRACE))
+                    return None
+                if not e.revoked:
+                    # Transient (HH 5xx, 429), the token stays due
+                    raise
+                logger.warning("Token refresh rejected for user %s: %s", user_id, e.detail)
+                await self.redis_service.untrack_token(user_id)
+                return None
+
+            await self.redis_service.set_user_token(
+                user_id,
+                token_data["access_token"],
+                token_data.get("expires_in", 86400)
+            )
+            if token_data.get("refresh_token"):
+                await self.redis_service.set_refresh_token(user_id, token_data["refresh_token"])
+            return token_data["access_token"]
+        finally:
+            await self.redis_service.release_lock(f"token_refresh:{user_id}", owner)
+
+    async def refresh_due_tokens(self) -> int:
+        """Refresh all expired tokens, return how many were refreshed"""
+        due = await self.redis_service.get_tokens_expiring_before(time.time(), REFRESH_BATCH_SIZE)
+        if not due:
+            return 0
+
+        semaphore = asyncio.Semaphore(REFRESH_CONCURRENCY)
+
+        async def refresh(user_id: str) -> bool:
+            async with semaphore:
+                try:
+                    return await self.refresh_user_token(user_id) is not None
+                except Exception as e:
+                    # Transient failure, the token stays due and is retried next round
+                    logger.warning("Token refresh failed for user %s: %s", user_id, e)
+                    return False
+
+        results = await asyncio.gather(*(refresh(user_id) for user_id in due))
+        return sum(results)
+
+    async def run(self):
+        """Refresh loop, runs until cancelled"""
+        while True:
+            try:
+                refreshed = await run_background_task("token_refresh", self.refresh_due_tokens())
+                if refreshed:
+                    logger.info("Refreshed %d HH tokens", refreshed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Token refresh round failed: %s", e)
+            await asyncio.sleep(await self._next_round_delay())
+
+    async def _next_round_delay(self) -> float:
+        """Sleep until the next token expires, at most REFRESH_INTERVAL"""
+        try:
+            expires_at = await self.redis_service.get_next_token_expiry()
+        except Exception as e:
+            logger.warning("Reading the next token expiry failed: %s", e)
+            return REFRESH_INTERVAL
+        if expires_at is None or expires_at <= time.time():
+            # Nothing tracked, or overdue tokens whose refresh just failed: retry at the usual pace
+            return REFRESH_INTERVAL
+        return min(expires_at - time.time(), REFRESH_INTERVAL)
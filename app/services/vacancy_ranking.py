@@ -0,0 +1,50 @@
+import heapq
+from typing import Any, Dict, List, Optional
+
+# Gross salaries are compared net of Russian personal income tax
+INCOME_TAX = 0.13
+
+
+def currency_rates(dictionaries: Dict[str, Any]) -> Dict[str, float]:
+    """Currency code -> units per rouble, from the HH currency dictionary"""
+    return {
+        currency["code"]: float(currency["rate"])
+        for currency in dictionaries.get("currency") or []
+        if currency.get("code") and currency.get("rate")
+    }
+
+
+def normalize_salary(salary: Optional[Dict[str, Any]], rates: Dict[str, float]) -> Optional[float]:
+    """Monthly net salary in roubles, the middle of the range when both ends are given"""
+    if not salary:
+        return None
+    bounds = [value for value in (salary.get("from"), salary.get("to")) if value]
+    rate = rates.get(salary.get("currency") or "RUR")
+    if not bounds or not rate:
+        return None
+    amount = sum(bounds) / len(bounds) / rate
+    if salary.get("gross"):
+        amount *= 1 - INCOME_TAX
+    return round(amount, 2)
+
+
+class TopN:
+    """Keeps the n highest scored items seen, in O(n) memory"""
+
+    def __init__(self, n: int):
+        self.n = n
+        self._heap: List[tuple] = []
+        self._seen = 0
+
+    def push(self, score: float, item: Dict[str, Any]):
+        # The sequence number breaks ties without comparing dicts
+        entry = (score, -self._seen, item)
+        self._seen += 1
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[Dict[str, Any]]:
+        """Kept items, best first"""
+        return [item for _, _, item in sorted(self._heap, reverse=True)]
@@ -0,0 +1,201 @@
+"""Local stand-in for api.hh.ru used by the benchmark harness.
+
+Serves deterministic, realistically sized payloads for the endpoints the
+service calls. Behaviour is configured through environment variables:
+
+    FAKE_HH_LATENCY_MS   mean added latency per request (default 50)
+    FAKE_HH_JITTER_MS    uniform jitter around the mean (default 20)
+    FAKE_HH_ERROR_RATE   fraction of requests answered with 503 (default 0)
+    FAKE_HH_FOUND        total vacancies reported by /vacancies (default 2000)
+
+Run with: uvicorn bench.fake_hh:app --port 9100
+"""
+import asyncio
+import os
+import random
+from collections import Counter
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("FAKE_HH_LATENCY_MS", "50"))
+JITTER_MS = float(os.getenv("FAKE_HH_JITTER_MS", "20"))
+ERROR_RATE = float(os.getenv("FAKE_HH_ERROR_RATE", "0"))
+FOUND = int(os.getenv("FAKE_HH_FOUND", "2000"))
+
+app = FastAPI(title="Fake HH API")
+calls = Counter()
+
+_rng = random.Random(42)
+_SKILLS = ["Python", "FastAPI", "PostgreSQL", "Redis", "Docker", "Kubernetes", "Go",
+           "SQL", "Linux", "Git", "asyncio", "Django", "Kafka", "React", "TypeScript"]
+_EMPLOYERS = [{"id": str(1000 + i), "name": f"Компания {i}"} for i in range(200)]
+_AREAS = [{"id": str(i), "name": f"Город {i}"} for i in range(1, 120)]
+_PARAGRAPH = (
+    "<p>Мы ищем инженера в команду разработки платформы. Вам предстоит проектировать "
+    "и развивать высоконагруженные сервисы, участвовать в код-ревью и улучшать "
+    "наблюдаемость системы.</p>"
+)
+
+
+def _vacancy(vacancy_id: int, full: bool) -> dict:
+    rng = random.Random(vacancy_id)
+    salary_from = rng.choice([None, 80000, 120000, 180000, 250000, 350000])
+    vacancy = {
+        "id": str(vacancy_id),
+        "name": rng.choice(["Python разработчик", "Senior Backend Engineer",
+                            "Инженер данных", "Go developer", "Fullstack разработчик"]),
+        "salary": {
+            "from": salary_from,
+            "to": salary_from * 1.5 if salary_from else None,
+            "currency": rng.choice(["RUR", "RUR", "RUR", "USD", "EUR"]),
+            "gross": rng.random() < 0.5,
+        } if salary_from else None,
+        "employer": rng.choice(_EMPLOYERS),
+        "area": rng.choice(_AREAS),
+        "published_at": "2024-01-15T10:00:00+0300",
+        "schedule": {"id": "remote", "name": "Удаленная работа"},
+        "employment": {"id": "full", "name": "Полная занятость"},
+        "experience": {"id": "between1And3", "name": "От 1 года до 3 лет"},
+        "snippet": {
+            "requirement": "Опыт коммерческой разработки на Python от 2 лет.",
+            "responsibility": "Разработка и поддержка микросервисов.",
+        },
+    }
+    if full:
+        # Real descriptions are typically 2-6 KB of HTML
+        vacancy["description"] = _PARAGRAPH * rng.randint(8, 20)
+        vacancy["key_skills"] = [{"name": s} for s in rng.sample(_SKILLS, rng.randint(3, 8))]
+    return vacancy
+
+
+def _build_areas() -> list:
+    """Country → region → city tree of roughly the size HH returns"""
+    countries = []
+    next_id = 1
+    for c in range(8):
+        country = {"id": str(next_id), "parent_id": None, "name": f"Страна {c}", "areas": []}
+        next_id += 1
+        for r in range(30):
+            region = {"id": str(next_id), "parent_id": country["id"], "name": f"Регион {c}-{r}", "areas": []}
+            next_id += 1
+            for t in range(25):
+                region["areas"].append({"id": str(next_id), "parent_id": region["id"],
+                                        "name": f"Город {c}-{r}-{t}", "areas": []})
+                next_id += 1
+            country["areas"].append(region)
+        countries.append(country)
+    return countries
+
+
+AREAS = _build_areas()
+DICTIONARIES = {
+    "experience": [{"id": "noExperience", "name": "Нет опыта"},
+                   {"id": "between1And3", "name": "От 1 года до 3 лет"},
+                   {"id": "between3And6", "name": "От 3 до 6 лет"},
+                   {"id": "moreThan6", "name": "Более 6 лет"}],
+    "employment": [{"id": "full", "name": "Полная занятость"},
+                   {"id": "part", "name": "Частичная занятость"},
+                   {"id": "project", "name": "Проектная работа"}],
+    "schedule": [{"id": "fullDay", "name": "Полный день"},
+                 {"id": "remote", "name": "Удаленная работа"},
+                 {"id": "flexible", "name": "Гибкий график"}],
+    "currency": [{"code": "RUR", "abbr": "₽", "name": "Рубли", "rate": 1.0},
+                 {"code": "USD", "abbr": "$", "name": "Доллары", "rate": 0.011},
+                 {"code": "EUR", "abbr": "€", "name": "Евро", "rate": 0.01}],
+}
+RESUME = {
+    "id": "resume-1",
+    "first_name": "Иван",
+    "last_name": "Петров",
+    "title": "Python разработчик",
+    "total_experience": {"months": 62},
+    "skill_set": ["Python", "FastAPI", "PostgreSQL", "Redis", "Docker"],
+}
+
+
+@app.middleware("http")
+async def simulate_upstream(request: Request, call_next):
+    if request.url.path.startswith("/_"):
+        return await call_next(request)
+
+    route = request.scope.get("path", "")
+    calls[_route_key(route)] += 1
+
+    delay = max(LATENCY_MS + _rng.uniform(-JITTER_MS, JITTER_MS), 0) / 1000
+    if delay:
+        await asyncio.sleep(delay)
+    if ERROR_RATE and _rng.random() < ERROR_RATE:
+        return JSONResponse({"errors": [{"type": "service_unavailable"}]}, status_code=503)
+    return await call_next(request)
+
+
+def _route_key(path: str) -> str:
+    parts = path.strip("/").split("/")
+    if parts[0] in ("vacancies", "resumes") and len(parts) > 1 and parts[1] != "mine":
+        return f"/{parts[0]}/{{id}}"
+    return "/" + "/".join(parts)
+
+
+@app.get("/_stats")
+async def stats():
+    return dict(calls)
+
+
+@app.post("/_reset")
+async def reset():
+    calls.clear()
+    return {"ok": True}
+
+
+@app.post("/oauth/token")
+async def oauth_token():
+    return {"access_token": "fake-access", "refresh_token": "fake-refresh",
+            "expires_in": 1209600, "token_type": "bearer"}
+
+
+@app.get("/me")
+async def me():
+    return {"id": "1", "email": "bench@example.com", "first_name": "Иван", "last_name": "Петров"}
+
+
+@app.get("/vacancies")
+async def vacancies(page: int = 0, per_page: int = 20):
+    per_page = min(per_page, 100)
+    pages = (min(FOUND, 2000) + per_page - 1) // per_page
+    start = page * per_page
+    items = [_vacancy(100000 + i, full=False)
+             for i in range(start, min(start + per_page, FOUND))]
+    return {"items": items, "found": FOUND, "pages": pages, "page": page, "per_page": per_page}
+
+
+@app.get("/vacancies/{vacancy_id}")
+async def vacancy(vacancy_id: str):
+    if not vacancy_id.isdigit():
+        raise HTTPException(404, "Vacancy not found")
+    return _vacancy(int(vacancy_id), full=True)
+
+
+@app.get("/resumes/mine")
+async def resumes_mine():
+    return {"items": [{"id": RESUME["id"]}], "found": 1}
+
+
+@app.get("/resumes/{resume_id}")
+async def resume(resume_id: str):
+    return RESUME
+
+
+@app.post("/negotiations", status_code=201)
+async def negotiations():
+    return {"id": str(_rng.randint(1, 10**9))}
+
+
+@app.get("/areas")
+async def areas():
+    return AREAS
+
+
+@app.get("/dictionaries")
+async def dictionaries():
+    return DICTIONARIES
@@ -0,0 +1,212 @@
+"""Benchmark harness for the API against a local fake HH server.
+
+Drives the main user-facing endpoints under concurrency and reports
+throughput, latency percentiles and upstream (HH) calls per scenario.
+Needs local Redis and Postgres reachable through REDIS_URL/DATABASE_URL.
+
+    python -m bench.run --spawn --concurrency 32 --requests 2000
+
+With --spawn the fake HH server and the API are started as uvicorn
+subprocesses; otherwise they are expected at --fake-url and --app-url
+(the API must then run with HH_API_URL/HH_OAUTH_URL pointing at the fake).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+import redis
+
+from app.core.auth import create_access_token
+
+VACANCY_ID_RANGE = (100000, 102000)
+
+
+def scenario_vacancies(rng: random.Random) -> tuple:
+    page = rng.randint(0, 9)
+    return "GET", f"/api/vacancies?text=python&page={page}&per_page=20"
+
+
+def scenario_vacancy(rng: random.Random) -> tuple:
+    return "GET", f"/api/vacancy/{rng.randint(*VACANCY_ID_RANGE)}"
+
+
+def scenario_history(rng: random.Random) -> tuple:
+    return "GET", "/api/history"
+
+
+def scenario_apply(rng: random.Random) -> tuple:
+    vacancy_id = rng.randint(*VACANCY_ID_RANGE)
+    return "POST", f"/api/vacancy/{vacancy_id}/apply?message=bench"
+
+
+SCENARIOS = {
+    "vacancies": scenario_vacancies,
+    "vacancy": scenario_vacancy,
+    "history": scenario_history,
+    "apply": scenario_apply,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def seed_users(redis_url: str, count: int) -> List[str]:
+    """Store fake HH tokens and return JWTs for the benchmark users"""
+    client = redis.Redis.from_url(redis_url)
+    jwts = []
+    for i in range(count):
+        user_id = f"bench-{i}"
+        client.setex(f"token:{user_id}", 3600, f"fake-access-{i}")
+        jwts.append(create_access_token({"sub": user_id}))
+    client.close()
+    return jwts
+
+
+async def run_scenario(name: str, app_url: str, fake_url: str, jwts: List[str],
+                       total: int, concurrency: int, seed: int) -> Dict:
+    generate = SCENARIOS[name]
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = iter(range(total))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=60) as client, \
+            httpx.AsyncClient(base_url=fake_url) as fake:
+        await fake.post("/_reset")
+
+        async def worker():
+            for _ in remaining:
+                method, path = generate(rng)
+                headers = {"Authorization": f"Bearer {rng.choice(jwts)}"}
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, headers=headers)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 0
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        upstream = (await fake.get("/_stats")).json()
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+    return {
+        "scenario": name,
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "errors": errors,
+        "statuses": statuses,
+        "upstream_calls": upstream,
+        "upstream_per_request": round(sum(upstream.values()) / total, 2) if total else 0.0,
+    }
+
+
+def print_report(results: List[Dict]):
+    header = f"{'scenario':<10} {'rps':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'err':>5} {'hh/req':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['scenario']:<10} {r['rps']:>8} {r['p50_ms']:>8} {r['p90_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['max_ms']:>8} {r['errors']:>5} {r['upstream_per_request']:>7}")
+    print()
+    for r in results:
+        calls = ", ".join(f"{path}={count}" for path, count in sorted(r["upstream_calls"].items()))
+        print(f"{r['scenario']:<10} upstream: {calls or '-'}")
+
+
+def spawn(module: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+
+
+def wait_ready(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--fake-url", default="http://127.0.0.1:9100")
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379"))
+    parser.add_argument("--spawn", action="store_true", help="start fake HH and the API as subprocesses")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated scenario names")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="also write results as JSON to this path")
+    args = parser.parse_args()
+
+    processes = []
+    try:
+        if args.spawn:
+            fake_port = int(args.fake_url.rsplit(":", 1)[1])
+            app_port = int(args.app_url.rsplit(":", 1)[1])
+            processes.append(spawn("bench.fake_hh:app", fake_port, {}))
+            wait_ready(f"{args.fake_url}/_stats")
+            subprocess.run([sys.executable, "-m", "app.manage", "init-db"], check=True)
+            processes.append(spawn("app.main:app", app_port, {
+                "HH_API_URL": args.fake_url,
+                "HH_OAUTH_URL": f"{args.fake_url}/oauth/token",
+                "REDIS_URL": args.redis_url,
+            }))
+            wait_ready(f"{args.app_url}/ready")
+
+        jwts = seed_users(args.redis_url, args.users)
+        results = []
+        for name in args.scenarios.split(","):
+            name = name.strip()
+            if name not in SCENARIOS:
+                parser.error(f"unknown scenario: {name}")
+            results.append(asyncio.run(run_scenario(
+                name, args.app_url, args.fake_url, jwts,
+                args.requests, args.concurrency, args.seed
+            )))
+
+        print_report(results)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()